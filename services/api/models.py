@@ -3,7 +3,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class PhotoResponse(BaseModel):
@@ -108,6 +108,7 @@ class SearchRequest(BaseModel):
     category: Optional[str] = None
     date_start: Optional[str] = None
     date_end: Optional[str] = None
+    limit: Optional[int] = Field(None, ge=1)  # Return only the top N results
 
 
 class StatisticsResponse(BaseModel):
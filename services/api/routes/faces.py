@@ -19,6 +19,7 @@ from typing import List
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+from services.api.routes.stats import invalidate_statistics_cache
 from services.ml.pipeline import MLPipeline
 from services.ml.storage.sqlite_store import SQLiteStore
 
@@ -46,6 +47,7 @@ async def delete_face(face_id: int, rebuild_index: bool = False):
         
         if result["status"] == "not_found":
             raise HTTPException(status_code=404, detail="Face not found")
+        invalidate_statistics_cache()
         
         # Optionally rebuild FAISS index
         if rebuild_index:
@@ -93,6 +95,8 @@ async def delete_multiple_faces(request: DeleteMultipleFacesRequest):
             except Exception as e:
                 logging.error(f"Failed to delete face {face_id}: {str(e)}")
                 errors.append(face_id)
+        if deleted_count > 0:
+            invalidate_statistics_cache()
         
         # Rebuild FAISS index once at the end
         index_rebuilt = False
@@ -153,6 +157,7 @@ async def recluster_all_faces():
     try:
         pipeline = MLPipeline()
         result = await pipeline.cluster_faces()
+        invalidate_statistics_cache()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -12,6 +12,7 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import Response
 
 from services.api.models import MergePeopleRequest, MergeMultiplePeopleRequest, PersonResponse, PhotoResponse, UpdatePersonRequest
+from services.api.routes.stats import invalidate_statistics_cache
 from services.ml.storage.sqlite_store import SQLiteStore
 
 router = APIRouter(prefix="/people", tags=["people"])
@@ -26,6 +27,7 @@ async def list_people():
         # This ensures the UI never shows empty placeholders
         orphaned = store.cleanup_orphaned_people()
         if orphaned:
+            invalidate_statistics_cache()
             import logging
             logging.info(f"Cleaned up {len(orphaned)} orphaned people with no faces: {orphaned}")
         
@@ -55,6 +57,7 @@ async def update_person(person_id: int, request: UpdatePersonRequest):
     store = SQLiteStore()
     try:
         store.update_person_name(person_id, request.name)
+        invalidate_statistics_cache()
         person = next((p for p in store.get_all_people() if p["id"] == person_id), None)
         if not person:
             raise HTTPException(status_code=404, detail="Person not found")
@@ -111,6 +114,7 @@ async def merge_people(request: MergePeopleRequest):
         store.merge_people(request.source_person_id, request.target_person_id)
         if source_face_ids:
             store.set_faces_person_locked(source_face_ids, True)
+        invalidate_statistics_cache()
         return {"status": "success", "message": "People merged successfully"}
     except HTTPException:
         raise
@@ -185,6 +189,7 @@ async def merge_multiple_people(request: MergeMultiplePeopleRequest):
             persons_merged += 1
             
             logging.info(f"Merged person {person_id} ({len(high_conf_face_ids)} faces) into {request.target_person_id}")
+        invalidate_statistics_cache()
         
         # Get updated target face count
         target_faces = store.get_faces_for_person(request.target_person_id)
@@ -218,6 +223,7 @@ async def delete_person(person_id: int):
             raise HTTPException(status_code=404, detail="Person not found")
         if face_ids:
             store.set_faces_suppressed(face_ids, True)
+        invalidate_statistics_cache()
         return {"status": "success", "message": "Person deleted successfully"}
     except HTTPException:
         raise
@@ -259,6 +265,7 @@ async def delete_person_with_faces(person_id: int):
         
         # Delete the person record
         store.delete_person(person_id)
+        invalidate_statistics_cache()
         
         # Rebuild FAISS index to remove deleted embeddings
         try:
@@ -300,6 +307,7 @@ async def recluster_person(person_id: int):
     try:
         pipeline = MLPipeline()
         result = await pipeline.recluster_person_faces(person_id)
+        invalidate_statistics_cache()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -328,6 +336,8 @@ async def cleanup_duplicate_people(dry_run: bool = False):
         
         # Step 2: Clean up orphaned people
         orphan_result = cleanup_orphaned_people(store, dry_run=dry_run)
+        if not dry_run:
+            invalidate_statistics_cache()
         
         return {
             "status": "success",
@@ -351,6 +361,8 @@ async def cleanup_orphans():
     try:
         store = SQLiteStore()
         orphaned_people = store.cleanup_orphaned_people()
+        if orphaned_people:
+            invalidate_statistics_cache()
         
         return {
             "status": "success",
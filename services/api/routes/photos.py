@@ -9,6 +9,7 @@ from typing import List
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 
 from services.api.models import PhotoResponse
+from services.api.routes.stats import invalidate_statistics_cache
 from services.ml.storage.sqlite_store import SQLiteStore
 from services.ml.utils import extract_exif_metadata
 
@@ -81,6 +82,7 @@ async def delete_photo(photo_id: int):
         deletion_result = store.delete_photo(photo_id)
         if not deletion_result["deleted"]:
             raise HTTPException(status_code=500, detail="Failed to delete photo from database")
+        invalidate_statistics_cache()
         
         # Step 2: Remove ALL embeddings from FAISS indices
         # This happens AFTER successful DB deletion
@@ -217,6 +219,9 @@ async def delete_photos(photo_ids: List[int]):
                 logging.error(f"Failed to delete photo {photo_id}: {str(e)}")
                 errors.append(photo_id)
         
+        if deleted_count:
+            invalidate_statistics_cache()
+        
         # Batch remove ALL embeddings from FAISS indices (after all DB deletions)
         try:
             faiss_index = FAISSIndex()
@@ -14,6 +14,7 @@ from typing import Dict, Iterator, Optional, Set
 from fastapi import APIRouter, BackgroundTasks, HTTPException
 
 from services.api.models import GlobalScanStatusResponse, JobStatusResponse, ScanRequest, ScanResponse
+from services.api.routes.stats import invalidate_statistics_cache
 from services.config import SCAN_BATCH_SIZE, STATE_DIR
 from services.ml.utils.path_utils import validate_folder_path as _validate_folder_path
 
@@ -276,6 +277,8 @@ async def process_folder_async(folder_path: str, recursive: bool, job_id: str):
             if (idx + 1) % 5 == 0:
                 await asyncio.sleep(0)
 
+        # New photos and locations are committed; don't serve pre-import totals
+        invalidate_statistics_cache()
         msg = f"Import complete: {len(imported_photos)} photos ready. Starting AI analysis..."
         _update_job(job_id, message=msg, phase="scanning")
         _update_global_state(
@@ -338,6 +341,7 @@ async def process_folder_async(folder_path: str, recursive: bool, job_id: str):
 
             # Save FAISS indices after each batch (in thread pool)
             await loop.run_in_executor(None, pipeline.index.save_all_dirty)
+            invalidate_statistics_cache()
 
         # =====================================================================
         # PHASE 3: FACE CLUSTERING (runs in thread pool)
@@ -347,6 +351,8 @@ async def process_folder_async(folder_path: str, recursive: bool, job_id: str):
         
         # Run clustering in thread pool
         cluster_result = await pipeline.cluster_faces()
+        # Clustering creates people and assigns faces to them
+        invalidate_statistics_cache()
         
         clusters = cluster_result.get("clusters", 0)
         faces_clustered = cluster_result.get("faces_clustered", 0)
@@ -530,12 +536,23 @@ async def scan_faces_async(job_id: str):
                 imported_photos=total,
             )
             
+            # Save FAISS indices every batch (in thread pool) rather than per photo
+            if (idx + 1) % SCAN_BATCH_SIZE == 0:
+                await loop.run_in_executor(None, pipeline.index.save_all_dirty)
+                invalidate_statistics_cache()
+            
             # Yield to event loop
             await asyncio.sleep(0)
 
+        # Save vectors from the final partial batch
+        await loop.run_in_executor(None, pipeline.index.save_all_dirty)
+        invalidate_statistics_cache()
+
         _update_job(job_id, message="Organizing faces...")
         _update_global_state(status="indexing", message="Organizing faces...", eta_seconds=None, phase="clustering")
         cluster_result = await pipeline.cluster_faces()
+        # Clustering creates people and assigns faces to them
+        invalidate_statistics_cache()
 
         clusters = cluster_result.get("clusters", 0)
         final_msg = f"Completed: {processed} photos scanned, {total_faces} faces, {clusters} people found"
@@ -1,7 +1,11 @@
 # PhotoSense-AI - https://github.com/abhishekanand16/PhotoSense-AI
 # Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
-from typing import List, Dict, Set, Tuple
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
 
+import numpy as np
 from fastapi import APIRouter, HTTPException
 
 from services.api.models import PhotoResponse, SearchRequest
@@ -24,7 +28,49 @@ from services.config import (
 
 router = APIRouter(prefix="/search", tags=["search"])
 
-def detect_query_intent(query: str) -> Dict[str, float]:
+# Bit flags recording which sources matched a candidate photo.
+# Bit order follows search priority so candidates are collected highest-priority first.
+SOURCE_CUSTOM_TAG = 1 << 0
+SOURCE_PERSON = 1 << 1
+SOURCE_FLORENCE = 1 << 2
+SOURCE_LOCATION = 1 << 3
+SOURCE_OBJECT = 1 << 4
+SOURCE_PET = 1 << 5
+SOURCE_CLIP = 1 << 6
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """
+    A search query tokenized once per request and shared by every source.
+    
+    Attributes:
+        raw: Query text as typed (stripped), used for name/case heuristics
+        lower: Lowercased, stripped query
+        tokens: Lowercased words in query order
+        words: Lowercased words as a set for overlap checks
+        search_terms: Query plus synonym expansions (see expand_query_with_synonyms)
+    """
+    raw: str
+    lower: str
+    tokens: Tuple[str, ...]
+    words: FrozenSet[str]
+    search_terms: Tuple[str, ...]
+
+    @classmethod
+    def build(cls, query: str) -> "QueryPlan":
+        raw = query.strip()
+        lower = raw.lower()
+        tokens = tuple(lower.split())
+        return cls(
+            raw=raw,
+            lower=lower,
+            tokens=tokens,
+            words=frozenset(tokens),
+            search_terms=_expand_normalized_query(lower),
+        )
+
+def detect_query_intent(plan: QueryPlan) -> Dict[str, float]:
     """
     Detect query intent using simple keyword rules.
     Returns boost multipliers for each source type.
@@ -38,8 +84,8 @@ def detect_query_intent(query: str) -> Dict[str, float]:
     - clothing: boost Florence (has clothing descriptions)
     - color: boost CLIP (great for color understanding)
     """
-    query_lower = query.lower().strip()
-    query_words = set(query_lower.split())
+    query_lower = plan.lower
+    query_words = plan.words
     
     boosts = {
         "person": 1.0,
@@ -57,7 +103,7 @@ def detect_query_intent(query: str) -> Dict[str, float]:
     
     # Check for person name pattern (capitalized word not in common keywords)
     # Simple heuristic: if query has capitalized words that aren't scene/object keywords
-    words = query.split()
+    words = plan.raw.split()
     potential_names = [w for w in words if len(w) > 1 and w[0].isupper() 
                        and w.lower() not in SEARCH_SCENE_KEYWORDS 
                        and w.lower() not in SEARCH_OBJECT_KEYWORDS 
@@ -113,36 +159,50 @@ def detect_query_intent(query: str) -> Dict[str, float]:
     return boosts
 
 
-def has_tag_overlap(query: str, tags: List[str]) -> bool:
+@lru_cache(maxsize=256)
+def compile_tag_overlap_pattern(query: str) -> Optional[Pattern[str]]:
     """
-    Check if query has meaningful word overlap with any tags.
-    Used to filter CLIP-only results without tag relevance.
-    """
-    if not tags:
-        return False
+    Compile the tag overlap check for a query into a single regex.
     
-    query_lower = query.lower().strip()
-    query_words = set(query_lower.split())
+    Words of 3+ characters match anywhere inside a tag, shorter words
+    only as whole tag words. Returns None when the query has no words.
+    """
+    query_words = set(query.lower().strip().split())
     
     # Remove generic words from query for overlap check
     meaningful_query_words = query_words - SEARCH_GENERIC_TAGS - SEARCH_LOCATION_INDICATORS
     if not meaningful_query_words:
         meaningful_query_words = query_words  # Fall back to all words
+    if not meaningful_query_words:
+        return None
+    
+    # Longest first so the alternation prefers the most specific word
+    ordered = sorted(meaningful_query_words, key=lambda w: (-len(w), w))
+    substring_words = [re.escape(w) for w in ordered if len(w) >= 3]
+    whole_words = [re.escape(w) for w in ordered if len(w) < 3]
+    
+    alternatives = []
+    if substring_words:
+        alternatives.append("|".join(substring_words))
+    if whole_words:
+        alternatives.append(r"(?<!\S)(?:" + "|".join(whole_words) + r")(?!\S)")
+    return re.compile("|".join(alternatives))
+
+
+def has_tag_overlap(query: str, tags: List[str]) -> bool:
+    """
+    Check if query has meaningful word overlap with any tags.
+    Used to filter CLIP-only results without tag relevance.
+    """
+    if not tags:
+        return False
     
-    for tag in tags:
-        tag_lower = tag.lower()
-        tag_words = set(tag_lower.split())
-        
-        # Check for word overlap
-        if meaningful_query_words & tag_words:
-            return True
-        
-        # Check if any query word is substring of tag
-        for qw in meaningful_query_words:
-            if len(qw) >= 3 and qw in tag_lower:
-                return True
+    pattern = compile_tag_overlap_pattern(query)
+    if pattern is None:
+        return False
     
-    return False
+    # Newline-joined so short words can't match across tag boundaries
+    return pattern.search("\n".join(tags).lower()) is not None
 
 
 def is_generic_only_match(matched_tags: List[str]) -> bool:
@@ -171,8 +231,12 @@ def expand_query_with_synonyms(query: str) -> List[str]:
     
     Returns list of search terms to use (original query + synonyms).
     """
-    query_lower = query.lower().strip()
-    
+    return list(_expand_normalized_query(query.lower().strip()))
+
+
+@lru_cache(maxsize=1024)
+def _expand_normalized_query(query_lower: str) -> Tuple[str, ...]:
+    """Synonym expansion for an already-normalized query, memoized per query."""
     # Start with original query
     search_terms = [query_lower]
     
@@ -190,17 +254,10 @@ def expand_query_with_synonyms(query: str) -> List[str]:
             search_terms.extend(synonyms)
     
     # Deduplicate while preserving order
-    seen = set()
-    unique_terms = []
-    for term in search_terms:
-        if term not in seen:
-            seen.add(term)
-            unique_terms.append(term)
-    
-    return unique_terms
+    return tuple(dict.fromkeys(search_terms))
 
 
-def search_by_people_name(store: SQLiteStore, query: str) -> Dict[int, Dict]:
+def search_by_people_name(store: SQLiteStore, plan: QueryPlan) -> Dict[int, Dict]:
     """
     Search for photos containing named people.
     
@@ -212,11 +269,9 @@ def search_by_people_name(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     - "Sarah Smith" matches photos with "Sarah Smith"
     """
     results = {}
-    query_lower = query.lower().strip()
-    query_words = set(query_lower.split())
     
     # Search for people matching the query
-    people_matches = store.search_people_by_name(query)
+    people_matches = store.search_people_by_name(plan.raw)
     
     for person in people_matches:
         person_id = person["id"]
@@ -262,7 +317,7 @@ def search_by_people_name(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     return results
 
 
-def search_by_florence_tags(store: SQLiteStore, query: str) -> Dict[int, Dict]:
+def search_by_florence_tags(store: SQLiteStore, plan: QueryPlan) -> Dict[int, Dict]:
     """
     PRIMARY SEARCH: Use Florence-2 rich tags stored in scenes table.
     
@@ -276,11 +331,11 @@ def search_by_florence_tags(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     (e.g., "half moon" also searches for "crescent moon", "quarter moon").
     """
     results = {}
-    query_lower = query.lower().strip()
-    query_words = set(query_lower.split())
+    query_lower = plan.lower
+    query_words = plan.words
     
-    # Expand query with synonyms for better partial matching
-    search_terms = expand_query_with_synonyms(query)
+    # Query expanded with synonyms for better partial matching
+    search_terms = plan.search_terms
     
     # Search for each term and combine results
     all_scene_matches = []
@@ -348,13 +403,12 @@ def search_by_florence_tags(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     return results
 
 
-def search_by_objects(store: SQLiteStore, query: str) -> Dict[int, Dict]:
+def search_by_objects(store: SQLiteStore, plan: QueryPlan) -> Dict[int, Dict]:
     """Search YOLO detected objects with confidence threshold pruning."""
     results = {}
-    query_lower = query.lower().strip()
     
     # Get objects matching the query pattern
-    objects = store.get_objects_by_pattern(query_lower)
+    objects = store.get_objects_by_pattern(plan.lower)
     
     for obj in objects:
         # Apply stricter confidence threshold
@@ -381,10 +435,10 @@ def search_by_objects(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     return results
 
 
-def search_by_pets(store: SQLiteStore, query: str) -> Dict[int, Dict]:
+def search_by_pets(store: SQLiteStore, plan: QueryPlan) -> Dict[int, Dict]:
     """Search pet detections with confidence threshold pruning."""
     results = {}
-    query_lower = query.lower().strip()
+    query_lower = plan.lower
     
     # Map query to pet species
     pet_mappings = {
@@ -430,7 +484,7 @@ def search_by_pets(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     return results
 
 
-def search_by_location(store: SQLiteStore, query: str) -> Dict[int, Dict]:
+def search_by_location(store: SQLiteStore, plan: QueryPlan) -> Dict[int, Dict]:
     """
     Search photos by location name (city, region, country).
     
@@ -441,11 +495,10 @@ def search_by_location(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     - "Beach Goa" -> handled separately (scene + location combination)
     """
     results = {}
-    query_lower = query.lower().strip()
-    query_words = query_lower.split()
+    query_words = plan.tokens
     
     # Search locations table
-    location_matches = store.search_locations_by_text(query)
+    location_matches = store.search_locations_by_text(plan.raw)
     
     for match in location_matches:
         photo_id = match["photo_id"]
@@ -505,7 +558,7 @@ def search_by_location(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     return results
 
 
-def search_by_custom_tags(store: SQLiteStore, query: str) -> Dict[int, Dict]:
+def search_by_custom_tags(store: SQLiteStore, plan: QueryPlan) -> Dict[int, Dict]:
     """
     Search user-created custom tags.
     
@@ -516,10 +569,9 @@ def search_by_custom_tags(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     Returns dict mapping photo_id to match info.
     """
     results = {}
-    query_lower = query.lower().strip()
     
     # Search custom tags
-    tag_matches = store.search_tags_by_text(query_lower)
+    tag_matches = store.search_tags_by_text(plan.lower)
     
     for match in tag_matches:
         photo_id = match["photo_id"]
@@ -554,7 +606,7 @@ def search_by_custom_tags(store: SQLiteStore, query: str) -> Dict[int, Dict]:
     return results
 
 
-async def search_by_clip(pipeline, query: str, existing_ids: Set[int]) -> Dict[int, float]:
+async def search_by_clip(pipeline, query: str, existing_ids: Iterable[int]) -> Dict[int, float]:
     """
     CLIP semantic search - supporting signal only.
     
@@ -807,73 +859,80 @@ async def search_photos(request: SearchRequest):
         query = request.query.strip()
         logging.debug(f"Search query: '{query}'")
         
+        # Tokenize and expand the query once for every source below
+        plan = QueryPlan.build(query)
+        
         # ==================================================================
         # STEP 0: Detect query intent for boosting
         # ==================================================================
-        intent_boosts = detect_query_intent(query)
+        intent_boosts = detect_query_intent(plan)
         logging.debug(f"Intent boosts: {intent_boosts}")
         
         # ==================================================================
         # STEP 1: Search custom user tags (HIGHEST PRIORITY)
         # ==================================================================
-        custom_tag_results = search_by_custom_tags(store, query)
+        custom_tag_results = search_by_custom_tags(store, plan)
         logging.debug(f"Custom tag matches: {len(custom_tag_results)} photos")
         
         # ==================================================================
         # STEP 1.5: Search named people (HIGH PRIORITY)
         # ==================================================================
-        person_results = search_by_people_name(store, query)
+        person_results = search_by_people_name(store, plan)
         logging.debug(f"Person name matches: {len(person_results)} photos")
         
         # ==================================================================
         # STEP 2: Search Florence-2 tags (PRIMARY SOURCE)
         # ==================================================================
-        florence_results = search_by_florence_tags(store, query)
+        florence_results = search_by_florence_tags(store, plan)
         logging.debug(f"Florence-2 matches: {len(florence_results)} photos")
         
         # ==================================================================
         # STEP 3: Search by location names
         # ==================================================================
-        location_results = search_by_location(store, query)
+        location_results = search_by_location(store, plan)
         logging.debug(f"Location matches: {len(location_results)} photos")
         
         # ==================================================================
         # STEP 4: Search YOLO objects
         # ==================================================================
-        object_results = search_by_objects(store, query)
+        object_results = search_by_objects(store, plan)
         logging.debug(f"Object matches: {len(object_results)} photos")
         
         # ==================================================================
         # STEP 5: Search pet detections (if relevant)
         # ==================================================================
         pet_results = {}
-        if any(kw in query.lower() for kw in SEARCH_PET_KEYWORDS):
-            pet_results = search_by_pets(store, query)
+        if any(kw in plan.lower for kw in SEARCH_PET_KEYWORDS):
+            pet_results = search_by_pets(store, plan)
             logging.debug(f"Pet matches: {len(pet_results)} photos")
         
-        tag_candidate_ids = (
-            set(custom_tag_results.keys()) |
-            set(person_results.keys()) |
-            set(florence_results.keys()) | 
-            set(location_results.keys()) |
-            set(object_results.keys()) | 
-            set(pet_results.keys())
-        )
+        # Candidate photo_id -> bitmask of matching sources, in priority order
+        source_masks: Dict[int, int] = {}
+        for source_bit, source_results in (
+            (SOURCE_CUSTOM_TAG, custom_tag_results),
+            (SOURCE_PERSON, person_results),
+            (SOURCE_FLORENCE, florence_results),
+            (SOURCE_LOCATION, location_results),
+            (SOURCE_OBJECT, object_results),
+            (SOURCE_PET, pet_results),
+        ):
+            for photo_id in source_results:
+                source_masks[photo_id] = source_masks.get(photo_id, 0) | source_bit
         
         # ==================================================================
         # STEP 6: CLIP semantic search (supporting signal)
         # ==================================================================
-        clip_results = await search_by_clip(pipeline, query, tag_candidate_ids)
+        clip_results = await search_by_clip(pipeline, query, source_masks.keys())
         logging.debug(f"CLIP matches: {len(clip_results)} photos")
         
         # ==================================================================
         # STEP 5.5: HARD FILTER - Apply tag overlap check for CLIP-only results
         # ==================================================================
         # Filter CLIP-only results: only keep if they have tag overlap
-        clip_only_ids = set(clip_results.keys()) - tag_candidate_ids
+        clip_only_ids = [pid for pid in clip_results if pid not in source_masks]
         filtered_clip_only = 0
         
-        for clip_id in list(clip_only_ids):
+        for clip_id in clip_only_ids:
             # For CLIP-only results, check if CLIP similarity is high enough
             # and the photo has ANY tags that overlap with query
             # Since these photos have no tag matches, we need to be strict
@@ -881,36 +940,68 @@ async def search_photos(request: SearchRequest):
             
             # Get photo's existing tags from DB for overlap check
             # (This is a stricter check - CLIP-only must still have some relevance)
-            photo_scenes = store.get_scenes_for_photo(clip_id) if hasattr(store, 'get_scenes_for_photo') else []
-            photo_tags = [s.get("scene_label", "") for s in photo_scenes] if photo_scenes else []
+            photo_scenes = store.get_scenes_for_photo(clip_id)
+            photo_tags = [s.get("scene_label", "") for s in photo_scenes]
             
             # If no tag overlap and CLIP similarity is not exceptionally high, filter out
-            if not has_tag_overlap(query, photo_tags) and clip_sim < 0.35:
+            if not has_tag_overlap(plan.lower, photo_tags) and clip_sim < 0.35:
                 del clip_results[clip_id]
                 filtered_clip_only += 1
         
         logging.debug(f"Filtered {filtered_clip_only} CLIP-only results without tag overlap")
         
         # Final candidate set
-        candidate_ids = tag_candidate_ids | set(clip_results.keys())
+        for photo_id in clip_results:
+            source_masks[photo_id] = source_masks.get(photo_id, 0) | SOURCE_CLIP
         
         # ==================================================================
-        # STEP 7: Calculate scores and rank with source-aware weighting
+        # STEP 7: Resolve filters (person, category) before ranking
+        # ==================================================================
+        # Applied before ranking so a result limit is never undershot
+        allowed_photo_ids = None
+        if request.person_id:
+            faces = store.get_faces_for_person(request.person_id)
+            allowed_photo_ids = {face["photo_id"] for face in faces}
+        
+        if request.category:
+            objects = store.get_objects_by_category(request.category)
+            category_photo_ids = {obj["photo_id"] for obj in objects}
+            if allowed_photo_ids is None:
+                allowed_photo_ids = category_photo_ids
+            else:
+                allowed_photo_ids &= category_photo_ids
+        
         # ==================================================================
+        # STEP 8: Calculate scores and rank with source-aware weighting
+        # ==================================================================
+        # Parallel score/photo arrays, ranked with a single argsort below
+        scores = np.empty(len(source_masks), dtype=np.float64)
         scored_photos = []
         
-        for photo_id in candidate_ids:
+        for photo_id, mask in source_masks.items():
+            if allowed_photo_ids is not None and photo_id not in allowed_photo_ids:
+                continue
+            
             photo = store.get_photo(photo_id)
             if not photo:
                 continue
             
-            custom_tag_data = custom_tag_results.get(photo_id)
-            person_data = person_results.get(photo_id)
-            florence_data = florence_results.get(photo_id)
-            location_data = location_results.get(photo_id)
-            object_data = object_results.get(photo_id)
-            pet_data = pet_results.get(photo_id)
-            clip_sim = clip_results.get(photo_id, 0.0)
+            # Date filter (photos without a date are kept)
+            date_taken = photo.get("date_taken")
+            if date_taken:
+                if request.date_start and date_taken < request.date_start:
+                    continue
+                if request.date_end and date_taken > request.date_end:
+                    continue
+            
+            # Only look up sources the bitmask says actually matched
+            custom_tag_data = custom_tag_results[photo_id] if mask & SOURCE_CUSTOM_TAG else None
+            person_data = person_results[photo_id] if mask & SOURCE_PERSON else None
+            florence_data = florence_results[photo_id] if mask & SOURCE_FLORENCE else None
+            location_data = location_results[photo_id] if mask & SOURCE_LOCATION else None
+            object_data = object_results[photo_id] if mask & SOURCE_OBJECT else None
+            pet_data = pet_results[photo_id] if mask & SOURCE_PET else None
+            clip_sim = clip_results[photo_id] if mask & SOURCE_CLIP else 0.0
             
             score, match_info = calculate_final_score(
                 photo_id=photo_id,
@@ -929,7 +1020,8 @@ async def search_photos(request: SearchRequest):
             if score < 0.05:
                 continue
             
-            scored_photos.append((score, photo, match_info))
+            scores[len(scored_photos)] = score
+            scored_photos.append(photo)
             
             # Log what matched for debugging
             matches = []
@@ -956,37 +1048,18 @@ async def search_photos(request: SearchRequest):
                 f"[generic:{match_info['is_generic_only']}]"
             )
         
-        # Sort by score (highest first)
-        scored_photos.sort(key=lambda x: x[0], reverse=True)
-        results = [photo for _, photo, _ in scored_photos]
+        # Sort by score (highest first), stable so ties keep source priority order
+        neg_scores = -scores[:len(scored_photos)]
+        if request.limit is not None and request.limit < len(scored_photos):
+            # Only the top `limit` results are returned: partial select, then sort those
+            top = np.sort(np.argpartition(neg_scores, request.limit - 1)[:request.limit])
+            order = top[np.argsort(neg_scores[top], kind="stable")]
+        else:
+            order = np.argsort(neg_scores, kind="stable")
+        results = [scored_photos[i] for i in order]
         
         logging.debug(f"Returning {len(results)} ranked results")
         
-        # ==================================================================
-        # STEP 7: Apply filters (person, category, date)
-        # ==================================================================
-        if request.person_id:
-            faces = store.get_faces_for_person(request.person_id)
-            person_photo_ids = {face["photo_id"] for face in faces}
-            results = [p for p in results if p["id"] in person_photo_ids]
-        
-        if request.category:
-            objects = store.get_objects_by_category(request.category)
-            category_photo_ids = {obj["photo_id"] for obj in objects}
-            results = [p for p in results if p["id"] in category_photo_ids]
-        
-        if request.date_start or request.date_end:
-            filtered = []
-            for photo in results:
-                date_taken = photo.get("date_taken")
-                if date_taken:
-                    if request.date_start and date_taken < request.date_start:
-                        continue
-                    if request.date_end and date_taken > request.date_end:
-                        continue
-                filtered.append(photo)
-            results = filtered
-        
         return results
 
     except Exception as e:
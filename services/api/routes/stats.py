@@ -1,5 +1,8 @@
 # PhotoSense-AI - https://github.com/abhishekanand16/PhotoSense-AI
 # Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
+import time
+from typing import Optional, Tuple
+
 from fastapi import APIRouter
 
 from services.api.models import StatisticsResponse
@@ -7,14 +10,32 @@ from services.ml.storage.sqlite_store import SQLiteStore
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
+# Totals only change between ingest batches, so dashboards polling this
+# endpoint share one set of COUNT(*) queries per TTL window.
+_STATS_TTL_SECONDS = 5.0
+_stats_cache: Optional[Tuple[float, StatisticsResponse]] = None
+
+
+def invalidate_statistics_cache() -> None:
+    """Drop the cached statistics so the next request recomputes them."""
+    global _stats_cache
+    _stats_cache = None
+
 
 @router.get("", response_model=StatisticsResponse)
 async def get_statistics():
+    global _stats_cache
+
+    cached = _stats_cache
+    if cached is not None and time.monotonic() - cached[0] < _STATS_TTL_SECONDS:
+        return cached[1]
+
     try:
         store = SQLiteStore(readonly=True)
         stats = store.get_statistics()
-        return StatisticsResponse(**stats)
+        response = StatisticsResponse(**stats)
     except FileNotFoundError:
+        # Database not created yet - don't cache so the first scan shows up immediately
         return StatisticsResponse(
             total_photos=0,
             total_faces=0,
@@ -23,3 +44,6 @@ async def get_statistics():
             labeled_faces=0,
             total_locations=0,
         )
+
+    _stats_cache = (time.monotonic(), response)
+    return response
@@ -13,7 +13,7 @@ Provides endpoints for managing user-created custom tags on photos:
 from typing import List
 
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
 from services.api.models import PhotoResponse
 from services.ml.storage.sqlite_store import SQLiteStore
@@ -25,11 +25,24 @@ class TagRequest(BaseModel):
     """Request to add a tag."""
     tag: str
 
+    @field_validator("tag")
+    @classmethod
+    def _normalize_tag(cls, value: str) -> str:
+        """Normalize once at deserialization (lowercase, trimmed)."""
+        return value.strip().lower()
+
 
 class TagsRequest(BaseModel):
     """Request to add multiple tags."""
     tags: List[str]
 
+    @field_validator("tags")
+    @classmethod
+    def _normalize_tags(cls, value: List[str]) -> List[str]:
+        """Normalize, drop empty tags and deduplicate while preserving order."""
+        normalized = (tag.strip().lower() for tag in value)
+        return list(dict.fromkeys(tag for tag in normalized if tag))
+
 
 class TagSummary(BaseModel):
     """Tag with photo count."""
@@ -102,11 +115,11 @@ async def add_tag_to_photo(photo_id: int, request: TagRequest):
         if not photo:
             raise HTTPException(status_code=404, detail="Photo not found")
         
-        if not request.tag or not request.tag.strip():
+        if not request.tag:
             raise HTTPException(status_code=400, detail="Tag cannot be empty")
         
         tag_id = store.add_tag(photo_id, request.tag)
-        return {"status": "success", "tag_id": tag_id, "tag": request.tag.lower().strip()}
+        return {"status": "success", "tag_id": tag_id, "tag": request.tag}
     except HTTPException:
         raise
     except ValueError as e:
@@ -125,13 +138,10 @@ async def add_tags_to_photo(photo_id: int, request: TagsRequest):
         if not photo:
             raise HTTPException(status_code=404, detail="Photo not found")
         
-        added_tags = []
-        for tag in request.tags:
-            if tag and tag.strip():
-                store.add_tag(photo_id, tag)
-                added_tags.append(tag.lower().strip())
+        # Tags are already normalized and deduplicated by TagsRequest
+        store.add_tags(photo_id, request.tags)
         
-        return {"status": "success", "added_tags": added_tags}
+        return {"status": "success", "added_tags": request.tags}
     except HTTPException:
         raise
     except Exception as e:
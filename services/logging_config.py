@@ -9,11 +9,18 @@ Logs are stored in the OS-specific app data directory:
 - Linux: ~/.local/share/PhotoSense-AI/logs/
 
 Log rotation: 10MB per file, keeps 5 backup files.
+
+Records are handed to a background listener thread through a queue, so
+logging from the ML pipeline never blocks on formatting or file I/O.
 """
 
+import atexit
 import logging
+import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from functools import cache
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from typing import Optional
 
@@ -27,7 +34,30 @@ LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 MAX_LOG_SIZE = 10 * 1024 * 1024  # 10 MB
 BACKUP_COUNT = 5
 
+
+class _SizeRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that checks the log path is a regular file once per open.
+
+    The stdlib handler stats the path on every record (bpo-45401) before the
+    size check; the answer can only change across a reopen, so cache it.
+    """
+
+    def _open(self):
+        self._regular_file = not os.path.exists(self.baseFilename) or os.path.isfile(self.baseFilename)
+        return super()._open()
+
+    def shouldRollover(self, record) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        if not self._regular_file or self.maxBytes <= 0:
+            return False
+        msg = "%s\n" % self.format(record)
+        self.stream.seek(0, 2)
+        return self.stream.tell() + len(msg) >= self.maxBytes
+
+
 _configured = False
+_listener: Optional[QueueListener] = None
 
 
 def configure_logging(
@@ -48,7 +78,7 @@ def configure_logging(
     Returns:
         The root logger instance
     """
-    global _configured
+    global _configured, _listener
     
     if _configured:
         return logging.getLogger()
@@ -72,7 +102,7 @@ def configure_logging(
     # File handler with rotation
     if file_logging:
         log_path = LOG_DIR / (log_file or "photosense.log")
-        file_handler = RotatingFileHandler(
+        file_handler = _SizeRotatingFileHandler(
             log_path,
             maxBytes=MAX_LOG_SIZE,
             backupCount=BACKUP_COUNT,
@@ -89,9 +119,12 @@ def configure_logging(
         console_handler.setFormatter(formatter)
         handlers.append(console_handler)
     
-    # Add handlers to root logger
-    for handler in handlers:
-        root_logger.addHandler(handler)
+    # Root logger only enqueues; the listener thread formats and writes
+    log_queue = queue.Queue(-1)
+    root_logger.addHandler(QueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
     
     # Log startup message
     root_logger.info(f"{'='*60}")
@@ -104,6 +137,7 @@ def configure_logging(
     return root_logger
 
 
+@cache
 def get_logger(name: str) -> logging.Logger:
     """
     Get a logger instance for a specific module.
@@ -128,8 +162,12 @@ def set_log_level(level: int) -> None:
     root_logger.setLevel(level)
     for handler in root_logger.handlers:
         handler.setLevel(level)
+    if _listener is not None:
+        for handler in _listener.handlers:
+            handler.setLevel(level)
 
 
+@cache
 def get_log_file_path() -> Path:
     """Get the path to the main log file."""
     return LOG_DIR / "photosense.log"
@@ -16,23 +16,12 @@ def find_duplicate_people(store: SQLiteStore) -> Dict[int, List[Dict]]:
         Dictionary mapping cluster_id to list of people with that cluster_id.
         Only includes cluster_ids that have more than one person.
     """
-    all_people = store.get_all_people()
-    
-    # Group people by cluster_id
-    cluster_groups = defaultdict(list)
-    for person in all_people:
-        cluster_id = person.get('cluster_id')
-        if cluster_id is not None:  # Skip people without cluster_id
-            cluster_groups[cluster_id].append(person)
-    
-    # Filter to only duplicates (more than one person per cluster)
-    duplicates = {
-        cluster_id: people 
-        for cluster_id, people in cluster_groups.items() 
-        if len(people) > 1
-    }
+    # SQLite does the GROUP BY / HAVING, so only duplicate rows come back
+    duplicates = defaultdict(list)
+    for person in store.get_people_in_duplicate_clusters():
+        duplicates[person['cluster_id']].append(person)
     
-    return duplicates
+    return dict(duplicates)
 
 
 def merge_duplicate_people(store: SQLiteStore, dry_run: bool = False) -> Dict:
@@ -67,24 +56,15 @@ def merge_duplicate_people(store: SQLiteStore, dry_run: bool = False) -> Dict:
     people_removed = 0
     
     for cluster_id, people in duplicates.items():
-        # Sort by created_at to find the oldest
-        people_sorted = sorted(people, key=lambda p: p.get('created_at', ''))
-        
-        # Keep the oldest person
-        target_person = people_sorted[0]
+        # Keep the oldest named person, or the oldest person if none are named
+        target_person = min(people, key=lambda p: (not p.get('name'), p.get('created_at') or ''))
         target_id = target_person['id']
         
-        # Check if any person has a name - prefer named person as target
-        named_people = [p for p in people_sorted if p.get('name')]
-        if named_people:
-            target_person = named_people[0]
-            target_id = target_person['id']
-        
         logger.info(f"\nCluster {cluster_id}: Found {len(people)} duplicate people")
         logger.info(f"  Keeping person {target_id} (name: {target_person.get('name', 'Unnamed')})")
         
         # Merge all others into the target
-        for person in people_sorted:
+        for person in people:
             if person['id'] == target_id:
                 continue
                 
@@ -93,9 +73,9 @@ def merge_duplicate_people(store: SQLiteStore, dry_run: bool = False) -> Dict:
             
             if not dry_run:
                 # Get face count before merge
-                faces_before = store.get_faces_for_person(source_id)
+                faces_before = store.count_faces_for_person(source_id)
                 store.merge_people(source_id, target_id)
-                logger.info(f"    Moved {len(faces_before)} faces from person {source_id} to {target_id}")
+                logger.info(f"    Moved {faces_before} faces from person {source_id} to {target_id}")
                 people_removed += 1
             
             merges_performed += 1
@@ -129,13 +109,7 @@ def cleanup_orphaned_people(store: SQLiteStore, dry_run: bool = False) -> Dict:
     Returns:
         Statistics about the cleanup operation
     """
-    all_people = store.get_all_people()
-    orphaned = []
-    
-    for person in all_people:
-        faces = store.get_faces_for_person(person['id'])
-        if len(faces) == 0:
-            orphaned.append(person)
+    orphaned = store.get_people_with_no_faces()
     
     logger.info(f"Found {len(orphaned)} people with no faces")
     
@@ -2,12 +2,24 @@
 # Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
 """CLIP-based zero-shot scene classification for scenery/environment recognition."""
 
+from collections import OrderedDict
+from pathlib import Path
 from typing import Dict, List, Tuple, Optional
+import hashlib
+import json
 import logging
+import os
+import threading
 
 import numpy as np
 from PIL import Image
 
+from services.config import CACHE_DIR
+
+# Prompt embeddings shared by every detector in the process, keyed by model + prompts
+_PROMPT_EMBEDDINGS: Dict[str, np.ndarray] = {}
+_PROMPT_EMBEDDINGS_LOCK = threading.Lock()
+
 
 class CLIPSceneDetector:
     """
@@ -178,17 +190,40 @@ class CLIPSceneDetector:
     MIN_CONFIDENCE = 0.25  # Minimum confidence to include a tag
     MAX_TAGS = 5  # Maximum number of CLIP tags per image
     
-    def __init__(self):
-        """Initialize CLIP scene detector."""
-        self._embedder = None
+    PATH_EMBEDDING_CACHE_SIZE = 256  # Embeddings kept for path-only detect() calls
+    
+    # Score each tag against the normalized mean of its prompts (one dot per tag).
+    # Set False to fall back to the max similarity over the tag's individual prompts.
+    USE_PROMPT_CENTROIDS = True
+    
+    def __init__(self, embedder=None):
+        """
+        Initialize CLIP scene detector.
+        
+        Args:
+            embedder: Optional shared ImageEmbedder, so the pipeline's CLIP model
+                is reused instead of loading a second copy
+        """
+        self._embedder = embedder
         self._prompt_embeddings = None
         self._tag_names = None
+        self._tags: List[str] = list(self.SCENE_PROMPTS)
+        # [start, end) range of each tag's prompts in the flattened prompt list
+        self._tag_slices: List[Tuple[int, int]] = []
+        # First prompt index of each tag, for the segmented max over prompts
+        self._tag_starts: Optional[np.ndarray] = None
+        # (num_tags, dim) matrix of per-tag prompt centroids, when USE_PROMPT_CENTROIDS
+        self._tag_matrix: Optional[np.ndarray] = None
+        # LRU of embeddings for path-only calls, keyed by (path, mtime_ns)
+        self._path_embeddings: "OrderedDict[Tuple[str, int], np.ndarray]" = OrderedDict()
+        self._path_embeddings_lock = threading.Lock()
     
     def _get_embedder(self):
-        """Lazy load CLIP embedder."""
+        """Lazy load CLIP embedder (unless one was shared in)."""
         if self._embedder is None:
-            from services.ml.embeddings.image_embedding import ImageEmbedder
-            self._embedder = ImageEmbedder()
+            # Fall back to the process-wide embedder so the CLIP model loads at most once
+            from services.ml.embeddings.image_embedding import get_image_embedder
+            self._embedder = get_image_embedder()
         return self._embedder
     
     def _get_prompt_embeddings(self) -> Tuple[np.ndarray, List[str]]:
@@ -204,24 +239,101 @@ class CLIPSceneDetector:
         # Flatten prompts and track which tag each belongs to
         all_prompts = []
         tag_for_prompt = []
+        tag_slices = []
         
         for tag, prompts in self.SCENE_PROMPTS.items():
+            start = len(all_prompts)
             for prompt in prompts:
                 all_prompts.append(prompt)
                 tag_for_prompt.append(tag)
+            tag_slices.append((start, len(all_prompts)))
         
-        # Batch embed all prompts
-        self._prompt_embeddings = embedder.embed_texts_batch(all_prompts)
-        self._tag_names = tag_for_prompt
+        # Prompts are static, so reuse embeddings from this process or a previous run
+        key = self._prompt_cache_key(embedder.model_name)
+        # Locked so concurrent detectors never encode the same prompts twice
+        with _PROMPT_EMBEDDINGS_LOCK:
+            embeddings = _PROMPT_EMBEDDINGS.get(key)
+            if embeddings is None:
+                embeddings = self._load_prompt_embeddings(key, len(all_prompts))
+            if embeddings is None:
+                embeddings = embedder.embed_texts_batch(all_prompts)
+                logging.info(f"CLIP scene detector: computed {len(all_prompts)} prompt embeddings")
+                # embed_texts_batch returns zeros on failure; never persist those
+                if np.any(embeddings):
+                    self._save_prompt_embeddings(key, embeddings)
+            if np.any(embeddings):
+                _PROMPT_EMBEDDINGS[key] = embeddings
         
-        logging.info(f"CLIP scene detector: computed {len(all_prompts)} prompt embeddings")
+        self._tag_names = tag_for_prompt
+        self._tag_slices = tag_slices
+        self._tag_starts = np.array([start for start, _ in tag_slices], dtype=np.intp)
+        if self.USE_PROMPT_CENTROIDS:
+            self._tag_matrix = self._build_tag_matrix(embeddings, tag_slices)
+        # Set last: it is the "ready" flag checked without a lock above
+        self._prompt_embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
         
         return self._prompt_embeddings, self._tag_names
     
+    @staticmethod
+    def _build_tag_matrix(embeddings: np.ndarray, tag_slices: List[Tuple[int, int]]) -> np.ndarray:
+        """L2-normalized mean prompt embedding of every tag, as a C-contiguous (T, D) matrix."""
+        # Filled in place so the result is one C-contiguous float32 buffer, no temporaries
+        tag_matrix = np.empty((len(tag_slices), embeddings.shape[1]), dtype=np.float32)
+        for row, (start, end) in zip(tag_matrix, tag_slices):
+            np.mean(embeddings[start:end], axis=0, out=row)
+        norms = np.linalg.norm(tag_matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        tag_matrix /= norms
+        return tag_matrix
+    
+    def _prompt_cache_key(self, model_name: str) -> str:
+        """Hash of the model and the prompts in order (tag slices depend on the order)."""
+        payload = json.dumps(self.SCENE_PROMPTS) + model_name
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _prompt_cache_path(key: str) -> Path:
+        return CACHE_DIR / f"clip_prompts_{key}.npy"
+    
+    def _load_prompt_embeddings(self, key: str, num_prompts: int) -> Optional[np.ndarray]:
+        """Load prompt embeddings saved by a previous run, or None on a miss."""
+        path = self._prompt_cache_path(key)
+        try:
+            embeddings = np.load(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable CLIP prompt cache {path}: {e}")
+            return None
+        if embeddings.shape[0] != num_prompts:
+            return None
+        logging.info(f"CLIP scene detector: loaded {num_prompts} prompt embeddings from cache")
+        # Stored as float16; widen and renormalize away the rounding error
+        embeddings = embeddings.astype(np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+    
+    def _save_prompt_embeddings(self, key: str, embeddings: np.ndarray) -> None:
+        """Write prompt embeddings atomically so concurrent runs never see a partial file."""
+        path = self._prompt_cache_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, embeddings.astype(np.float16))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write CLIP prompt cache {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
     def detect(
         self, 
         image_path: str,
-        image_rgb: Optional[Image.Image] = None
+        image_rgb: Optional[Image.Image] = None,
+        image_embedding: Optional[np.ndarray] = None,
     ) -> List[Tuple[str, float]]:
         """
         Detect scene tags using CLIP zero-shot classification.
@@ -229,51 +341,142 @@ class CLIPSceneDetector:
         Args:
             image_path: Path to image file (for logging if image_rgb provided)
             image_rgb: Optional pre-decoded PIL RGB image (from ImageCache)
+            image_embedding: Optional normalized CLIP embedding already computed
+                for this image with the same model; skips the image forward pass
             
         Returns:
             List of (tag_name, confidence) tuples, sorted by confidence
         """
-        try:
-            embedder = self._get_embedder()
-            prompt_embeddings, tag_names = self._get_prompt_embeddings()
-            
-            # Get image embedding - use pre-decoded image if provided
-            if image_rgb is not None:
-                image_embedding = embedder.embed_pil(image_rgb)
-            else:
-                image_embedding = embedder.embed(image_path)
-            
-            if np.allclose(image_embedding, 0):
-                logging.warning(f"CLIP scene detection failed - zero embedding for {image_path}")
-                return []
-            
-            # Compute similarities (dot product of normalized vectors = cosine similarity)
-            similarities = np.dot(prompt_embeddings, image_embedding)
-            
-            # Aggregate by tag (max similarity across prompts for each tag)
-            tag_scores: Dict[str, float] = {}
-            for tag_name, sim in zip(tag_names, similarities):
-                current = tag_scores.get(tag_name, -1.0)
-                if sim > current:
-                    tag_scores[tag_name] = float(sim)
+        return self.detect_batch(
+            [image_path],
+            images=None if image_rgb is None else [image_rgb],
+            image_embeddings=None if image_embedding is None else image_embedding.reshape(1, -1),
+        )[0]
+    
+    def detect_batch(
+        self,
+        image_paths: List[str],
+        images: Optional[List[Optional[Image.Image]]] = None,
+        image_embeddings: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Detect scene tags for several images with one CLIP forward pass.
+        
+        Args:
+            image_paths: Paths to image files (decoded if neither images nor embeddings given)
+            images: Optional pre-decoded PIL RGB images aligned with image_paths
+            image_embeddings: Optional (N, D) normalized CLIP embeddings aligned with image_paths
             
-            # Convert to list and filter by threshold
-            results = [
-                (tag, score)
-                for tag, score in tag_scores.items()
-                if score >= self.MIN_CONFIDENCE
-            ]
+        Returns:
+            One list of (tag_name, confidence) tuples per image, sorted by confidence
+        """
+        try:
+            prompt_embeddings, _ = self._get_prompt_embeddings()
             
-            # Sort by confidence and limit
-            results.sort(key=lambda x: x[1], reverse=True)
-            results = results[:self.MAX_TAGS]
+            # Get image embeddings - reuse precomputed ones, else embed (decoding if needed)
+            if image_embeddings is None:
+                if images is None:
+                    image_embeddings = self._embed_paths(image_paths)
+                else:
+                    image_embeddings = self._get_embedder().embed_pil_batch(images)
+            # Contiguous float32 so the products below go straight to BLAS sgemm
+            # (a float64 or strided input would force an upcast/copy of the operands)
+            image_embeddings = np.ascontiguousarray(image_embeddings, dtype=np.float32)
             
-            logging.info(f"CLIP scene detection: {len(results)} tags for {image_path}")
-            return results
+            # Dot product of normalized vectors = cosine -> (N, num_tags)
+            if self._tag_matrix is not None:
+                tag_scores = np.dot(image_embeddings, self._tag_matrix.T)
+            else:
+                # Max similarity across each tag's prompts; prompts are stored
+                # contiguously per tag, so this is one segmented reduction
+                similarities = np.dot(image_embeddings, prompt_embeddings.T)
+                tag_scores = np.maximum.reduceat(similarities, self._tag_starts, axis=1)
             
+            top_tags = self._top_tags(tag_scores)
+            top_scores = np.take_along_axis(tag_scores, top_tags, axis=1)
+            # Rows are sorted by score, so the tags passing the threshold are a prefix
+            num_passing = (top_scores >= self.MIN_CONFIDENCE).sum(axis=1)
+        except Exception as e:
+            logging.error(f"CLIP scene detection failed for {len(image_paths)} images: {e}")
+            return [[] for _ in image_paths]
+        
+        return [
+            self._select_tags(image_path, image_embedding, image_top_tags[:count], image_top_scores[:count])
+            for image_path, image_embedding, image_top_tags, image_top_scores, count
+            in zip(image_paths, image_embeddings, top_tags, top_scores, num_passing)
+        ]
+    
+    def _embed_paths(self, image_paths: List[str]) -> np.ndarray:
+        """Embed images from disk, reusing cached embeddings of unchanged files."""
+        keys = []
+        for path in image_paths:
+            try:
+                keys.append((path, os.stat(path).st_mtime_ns))
+            except OSError:
+                keys.append(None)
+        
+        embeddings = [None] * len(image_paths)
+        with self._path_embeddings_lock:
+            for i, key in enumerate(keys):
+                if key in self._path_embeddings:
+                    self._path_embeddings.move_to_end(key)
+                    embeddings[i] = self._path_embeddings[key]
+        
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            computed = self._get_embedder().embed_pil_batch(
+                [self._open_rgb(image_paths[i]) for i in misses]
+            )
+            with self._path_embeddings_lock:
+                for i, embedding in zip(misses, computed):
+                    embeddings[i] = embedding
+                    if keys[i] is not None and np.any(embedding):
+                        self._path_embeddings[keys[i]] = embedding
+                while len(self._path_embeddings) > self.PATH_EMBEDDING_CACHE_SIZE:
+                    self._path_embeddings.popitem(last=False)
+        
+        return np.stack(embeddings)
+    
+    def _top_tags(self, tag_scores: np.ndarray) -> np.ndarray:
+        """
+        Indices of the MAX_TAGS best tags per row, best first.
+        Selects with argpartition, then sorts only the selected k (ties keep tag order).
+        """
+        k = min(self.MAX_TAGS, tag_scores.shape[1])
+        if k < tag_scores.shape[1]:
+            candidates = np.argpartition(-tag_scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(k), tag_scores.shape)
+        candidate_scores = np.take_along_axis(tag_scores, candidates, axis=1)
+        order = np.lexsort((candidates, -candidate_scores), axis=1)
+        return np.take_along_axis(candidates, order, axis=1)
+    
+    @staticmethod
+    def _open_rgb(image_path: str) -> Optional[Image.Image]:
+        """Decode an image as RGB, or None if it can't be read."""
+        try:
+            return Image.open(image_path).convert("RGB")
         except Exception as e:
-            logging.error(f"CLIP scene detection failed for {image_path}: {e}")
+            logging.error(f"CLIP scene detection could not read {image_path}: {e}")
+            return None
+    
+    def _select_tags(
+        self,
+        image_path: str,
+        image_embedding: np.ndarray,
+        top_tags: np.ndarray,
+        top_scores: np.ndarray,
+    ) -> List[Tuple[str, float]]:
+        """Pair one image's ranked, already-thresholded tag indices with their names."""
+        # Failed embeds come back as exact zeros; any() stops at the first non-zero
+        if not image_embedding.any():
+            logging.warning(f"CLIP scene detection failed - zero embedding for {image_path}")
             return []
+        
+        results = [(self._tags[tag_idx], score) for tag_idx, score in zip(top_tags.tolist(), top_scores.tolist())]
+        
+        logging.info(f"CLIP scene detection: {len(results)} tags for {image_path}")
+        return results
     
     def get_scene_tags(self, image_path: str) -> List[str]:
         """
@@ -2,24 +2,23 @@
 # Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
 """Face detection using InsightFace (ONNX-based)."""
 
+import threading
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
-import cv2
 import numpy as np
 
-# Apply fast face alignment patch BEFORE any InsightFace usage/imports.
-# This prevents InsightFace from binding to deprecated scikit-image APIs.
-from services.ml.utils.face_align_patch import apply_patch
-apply_patch()
-
-import insightface
-from insightface.app import FaceAnalysis
+from services.config import IMAGE_CACHE_SIZES
+from services.ml.utils.onnx_providers import execution_providers, session_options
 
 
 class FaceDetector:
     """Face detection and alignment using InsightFace ONNX model."""
 
+    # SCRFD letterboxes to 640px anyway; larger inputs are shrunk to the same
+    # size ImageCache prepares for faces before they reach the detector
+    MAX_INPUT_SIZE = IMAGE_CACHE_SIZES["face"]
+
     def __init__(self, confidence_threshold: float = 0.6, model_name: str = "buffalo_l"):
         """
         Initialize face detector.
@@ -31,47 +30,105 @@ class FaceDetector:
         self.confidence_threshold = confidence_threshold
         self.model_name = model_name
         self.app = None  # Lazy loading
+        self._face_align = None
+        self._load_lock = threading.Lock()
 
     def _load_model(self) -> None:
-        """Lazy load the InsightFace model."""
-        if self.app is None:
-            # Load detection + recognition for full pipeline (includes alignment)
-            self.app = FaceAnalysis(
-                name=self.model_name,
-                allowed_modules=['detection', 'recognition'],  # Need recognition for embeddings
-                providers=['CPUExecutionProvider']
-            )
-            self.app.prepare(ctx_id=-1, det_size=(640, 640))
-
-    def detect(self, image_path: str) -> List[Tuple[int, int, int, int, float]]:
+        """Lazy load the InsightFace model (once, even with concurrent callers)."""
+        if self.app is not None:
+            return
+        with self._load_lock:
+            if self.app is not None:
+                return
+            # cv2/InsightFace pull in ONNX Runtime, so they are only imported
+            # once a face task actually needs the model.
+            # Apply fast face alignment patch BEFORE any InsightFace usage/imports.
+            # This prevents InsightFace from binding to deprecated scikit-image APIs.
+            from services.ml.utils.face_align_patch import apply_patch
+            apply_patch()
+
+            from insightface.app import FaceAnalysis
+            from insightface.model_zoo import model_zoo
+            from insightface.utils import face_align
+
+            # FaceAnalysis only forwards providers to its sessions, so inject our
+            # SessionOptions by swapping the session class while the models load
+            session_cls = model_zoo.PickableInferenceSession
+            providers, ctx_id = execution_providers()
+            sess_options = session_options(providers)
+
+            class _TunedSession(session_cls):
+                def __init__(self, model_path, **kwargs):
+                    kwargs.setdefault('sess_options', sess_options)
+                    super().__init__(model_path, **kwargs)
+
+            model_zoo.PickableInferenceSession = _TunedSession
+            try:
+                # Load detection + recognition for full pipeline (includes alignment)
+                app = FaceAnalysis(
+                    name=self.model_name,
+                    allowed_modules=['detection', 'recognition'],  # Need recognition for embeddings
+                    providers=providers
+                )
+            finally:
+                model_zoo.PickableInferenceSession = session_cls
+            app.prepare(ctx_id=ctx_id, det_size=(640, 640))
+            self._face_align = face_align
+            # Publish only once prepared, so the unlocked fast path never sees a half-loaded app
+            self.app = app
+
+    def _downsample(self, image_bgr: np.ndarray, scale_factor: float) -> Tuple[np.ndarray, float]:
+        """Shrink oversized images, folding the resize into scale_factor."""
+        h, w = image_bgr.shape[:2]
+        max_dim = max(h, w)
+        if max_dim <= self.MAX_INPUT_SIZE:
+            return image_bgr, scale_factor
+        import cv2
+        scale = self.MAX_INPUT_SIZE / max_dim
+        resized = cv2.resize(image_bgr, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        return resized, scale_factor * scale
+
+    @staticmethod
+    def _to_original_xywh(bboxes: np.ndarray, inv_scale: float) -> List[List[int]]:
+        """Convert detector (x1, y1, x2, y2, score) rows to original-image [x, y, w, h] ints in one cast."""
+        corners = bboxes[:, :4].astype(np.int32)
+        xywh = np.concatenate([corners[:, :2], corners[:, 2:] - corners[:, :2]], axis=1)
+        if inv_scale != 1.0:
+            xywh = (xywh * inv_scale).astype(np.int32)
+        return xywh.tolist()
+
+    def detect(self, image_path: str, image_bgr: np.ndarray) -> List[Tuple[int, int, int, int, float]]:
         """
         Detect faces in an image.
+        
+        Args:
+            image_path: Path to image (for logging)
+            image_bgr: Decoded BGR image (from ImageCache)
+        
         Returns list of (x, y, width, height, confidence) tuples.
         """
+        import logging
+        
         self._load_model()
-        image = cv2.imread(image_path)
-        if image is None:
+        
+        image_bgr, scale_factor = self._downsample(image_bgr, 1.0)
+        inv_scale = 1.0 / scale_factor
+        
+        try:
+            # Detection only - no recognition pass is needed for bare boxes
+            bboxes, _ = self.app.det_model.detect(image_bgr, max_num=0, metric='default')
+        except Exception as e:
+            logging.error(f"Face detection failed for {image_path}: {e}")
             return []
 
-        faces = self.app.get(image)
-
-        results = []
-        for face in faces:
-            confidence = float(face.det_score)
-            
-            if confidence >= self.confidence_threshold:
-                bbox = face.bbox.astype(int)
-                x1, y1, x2, y2 = bbox
-                width = x2 - x1
-                height = y2 - y1
-                results.append((int(x1), int(y1), int(width), int(height), confidence))
-
-        return results
+        bboxes = bboxes[bboxes[:, 4] >= self.confidence_threshold]
+        xywh = self._to_original_xywh(bboxes, inv_scale)
+        return [(*box, confidence) for box, confidence in zip(xywh, bboxes[:, 4].tolist())]
     
     def detect_with_embeddings(
         self, 
         image_path: str,
-        image_bgr: Optional[np.ndarray] = None,
+        image_bgr: np.ndarray,
         scale_factor: float = 1.0
     ) -> List[Dict]:
         """
@@ -79,8 +136,8 @@ class FaceDetector:
         More efficient than separate detection + embedding.
         
         Args:
-            image_path: Path to image (for logging purposes if image_bgr provided)
-            image_bgr: Optional pre-decoded BGR image (from ImageCache)
+            image_path: Path to image (for logging)
+            image_bgr: Decoded BGR image (from ImageCache)
             scale_factor: Scale factor to map bboxes back to original coordinates
         
         Returns list of dicts with:
@@ -89,74 +146,125 @@ class FaceDetector:
         - embedding: 512-dim face embedding (aligned internally by InsightFace)
         - landmarks: facial landmarks (5 points: left_eye, right_eye, nose, mouth_left, mouth_right)
         """
+        return self.detect_with_embeddings_batch(
+            [image_path],
+            images_bgr=[image_bgr],
+            scale_factors=[scale_factor],
+        )[0]
+    
+    def detect_with_embeddings_batch(
+        self,
+        image_paths: List[str],
+        images_bgr: List[np.ndarray],
+        scale_factors: Optional[List[float]] = None,
+    ) -> List[List[Dict]]:
+        """
+        Detect faces in several images, then embed every confident face with a
+        single recognition forward pass.
+        
+        Args:
+            image_paths: Paths to images (for logging)
+            images_bgr: Decoded BGR images (from ImageCache) aligned with image_paths
+            scale_factors: Optional per-image scale factors to map bboxes back to
+                original coordinates
+        
+        Returns one list per image, in the format of detect_with_embeddings.
+        """
         import logging
         
         self._load_model()
         
-        # Use pre-decoded image if provided, otherwise load from disk
-        if image_bgr is not None:
-            image = image_bgr
-        else:
-            image = cv2.imread(image_path)
-            if image is None:
-                logging.warning(f"Could not read image: {image_path}")
-                return []
-
-        try:
-            faces = self.app.get(image)
-        except Exception as e:
-            logging.error(f"Face detection failed for {image_path}: {e}")
-            return []
-
-        results = []
-        inv_scale = 1.0 / scale_factor if scale_factor != 1.0 else 1.0
+        if scale_factors is None:
+            scale_factors = [1.0] * len(image_paths)
+        scale_factors = list(scale_factors)
         
-        for face in faces:
-            confidence = float(face.det_score)
-            
-            if confidence >= self.confidence_threshold:
-                bbox = face.bbox.astype(int)
-                x1, y1, x2, y2 = bbox
-                width = x2 - x1
-                height = y2 - y1
-                
-                # Scale bbox back to original image coordinates
-                if scale_factor != 1.0:
-                    x1 = int(x1 * inv_scale)
-                    y1 = int(y1 * inv_scale)
-                    width = int(width * inv_scale)
-                    height = int(height * inv_scale)
-                
-                # Extract embedding (already aligned by InsightFace)
-                embedding = face.embedding
-                
-                # Skip faces without embeddings (recognition model not loaded)
-                if embedding is None:
-                    logging.warning(f"No embedding generated for face in {image_path} - recognition model may not be loaded")
+        # Detection runs per image; faces below threshold never reach recognition
+        detections = []
+        chips = []
+        rec_model = self.app.models['recognition']
+        for index, (image_path, image) in enumerate(zip(image_paths, images_bgr)):
+            image, scale_factors[index] = self._downsample(image, scale_factors[index])
+            try:
+                bboxes, kpss = self.app.det_model.detect(image, max_num=0, metric='default')
+                keep = bboxes[:, 4] >= self.confidence_threshold
+                bboxes = bboxes[keep]
+                if kpss is None:
+                    # Alignment needs landmarks; without them no embeddings can be made
+                    if len(bboxes):
+                        logging.warning(f"No embedding generated for face in {image_path} - detector returned no landmarks")
+                    detections.append(None)
                     continue
-                
-                # Normalize embedding
-                norm = np.linalg.norm(embedding)
-                if norm > 0:
-                    embedding = embedding / norm
-                else:
+                kpss = kpss[keep]
+                image_chips = [
+                    self._face_align.norm_crop(image, landmark=kps, image_size=rec_model.input_size[0])
+                    for kps in kpss
+                ]
+            except Exception as e:
+                logging.error(f"Face detection failed for {image_path}: {e}")
+                detections.append(None)
+                continue
+            
+            detections.append((bboxes, kpss, len(chips)))
+            chips.extend(image_chips)
+        
+        # One recognition forward pass for every face in the batch
+        embeddings = None
+        if chips:
+            try:
+                embeddings = np.asarray(rec_model.get_feat(chips), dtype=np.float32)
+            except Exception as e:
+                logging.error(f"Face embedding failed for {len(image_paths)} images: {e}")
+                return [[] for _ in image_paths]
+            
+            # L2-normalize every embedding at once; zero-norm rows are dropped below
+            norms = np.sqrt(np.einsum('ij,ij->i', embeddings, embeddings))
+            embeddings /= np.maximum(norms, 1e-12)[:, None]
+        
+        all_results = []
+        for image_path, scale_factor, detection in zip(image_paths, scale_factors, detections):
+            if detection is None:
+                all_results.append([])
+                continue
+            bboxes, kpss, offset = detection
+            
+            results = []
+            inv_scale = 1.0 / scale_factor if scale_factor != 1.0 else 1.0
+            
+            # Rescale every bbox (x, y, width, height) and landmark set back to
+            # original image coordinates at once
+            xywh = self._to_original_xywh(bboxes, inv_scale)
+            landmarks_all = (kpss * inv_scale).astype(int).tolist()
+            confidences = bboxes[:, 4].tolist()
+            
+            for i, (bbox, landmarks, confidence) in enumerate(zip(xywh, landmarks_all, confidences)):
+                if norms[offset + i] == 0:
                     logging.warning(f"Zero-norm embedding for face in {image_path}")
                     continue
                 
-                # Extract landmarks (5 key points) and scale them
-                landmarks = None
-                if hasattr(face, 'kps') and face.kps is not None:
-                    if scale_factor != 1.0:
-                        landmarks = [[int(x * inv_scale), int(y * inv_scale)] for x, y in face.kps]
-                    else:
-                        landmarks = face.kps.astype(int).tolist()
-                
                 results.append({
-                    'bbox': (int(x1), int(y1), int(width), int(height)),
+                    'bbox': tuple(bbox),
                     'confidence': confidence,
-                    'embedding': embedding.astype(np.float32),
+                    'embedding': embeddings[offset + i],
                     'landmarks': landmarks
                 })
+            
+            logging.info(f"Detected {len(results)} faces with embeddings in {image_path}")
+            all_results.append(results)
         
-        logging.info(f"Detected {len(results)} faces with embeddings in {image_path}")
-        return results
+        return all_results
+
+
+# Shared detector so every pipeline instance reuses one set of ONNX sessions
+_default_detector = None
+_default_detector_lock = threading.Lock()
+
+
+def get_face_detector() -> FaceDetector:
+    """Get the process-wide FaceDetector singleton. Thread-safe initialization."""
+    global _default_detector
+    if _default_detector is None:
+        with _default_detector_lock:
+            # Double-check locking pattern
+            if _default_detector is None:
+                _default_detector = FaceDetector()
+    return _default_detector
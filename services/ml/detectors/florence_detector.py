@@ -2,15 +2,37 @@
 # Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
 """Florence-2 vision-language model for rich image captioning and tagging."""
 
+from contextlib import ExitStack
 from typing import List, Tuple, Optional
+import importlib.util
 import logging
 import re
+import threading
 import traceback
 
 import torch
 from PIL import Image
 
 
+def _sentence_end_criteria(tokenizer):
+    """Stopping criteria that finish a row as soon as it emits '.', '!' or '?'."""
+    from transformers import StoppingCriteria, StoppingCriteriaList
+    
+    stop_ids = torch.tensor(sorted({
+        tokenizer.encode(mark, add_special_tokens=False)[-1] for mark in ".!?"
+    }))
+    
+    class SentenceEnd(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            nonlocal stop_ids
+            if stop_ids.device != input_ids.device:
+                stop_ids = stop_ids.to(input_ids.device)
+            # Per-row flags: finished rows pad while the rest keep decoding
+            return torch.isin(input_ids[:, -1], stop_ids)
+    
+    return StoppingCriteriaList([SentenceEnd()])
+
+
 class FlorenceDetector:
     """
     Florence-2-base detector for rich image understanding.
@@ -24,7 +46,7 @@ class FlorenceDetector:
     """
     
     # Stopwords to filter from tags
-    STOPWORDS = {
+    STOPWORDS = frozenset({
         'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
         'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
         'should', 'may', 'might', 'can', 'of', 'in', 'on', 'at', 'to', 'for',
@@ -33,14 +55,23 @@ class FlorenceDetector:
         'why', 'how', 'all', 'both', 'each', 'few', 'more', 'most', 'other',
         'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so',
         'than', 'too', 'very', 'this', 'that', 'these', 'those'
-    }
+    })
     
     # Generic/overly broad tags to filter
-    GENERIC_TAGS = {
+    GENERIC_TAGS = frozenset({
         'photo', 'image', 'picture', 'scene', 'view', 'background',
         'foreground', 'object', 'item', 'thing', 'stuff', 'area',
         'place', 'location', 'shot', 'photograph', 'pic'
-    }
+    })
+    
+    # Words never emitted as tags (checked once per word)
+    _EXCLUDED_WORDS = STOPWORDS | GENERIC_TAGS
+    
+    # Extract words (alphanumeric only)
+    _WORD_RE = re.compile(r'\b[a-z]+\b')
+    
+    # Sentence boundary used to cut the short caption out of the detailed one
+    _SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
     
     # Maximum tags to extract
     MAX_TAGS = 10
@@ -48,6 +79,16 @@ class FlorenceDetector:
     # Minimum confidence for tags
     MIN_TAG_CONFIDENCE = 0.6
     
+    # Decode budget per task; a one-sentence caption rarely exceeds ~20 tokens
+    MAX_NEW_TOKENS = {
+        "<CAPTION>": 32,
+        "<DETAILED_CAPTION>": 100,
+    }
+    DEFAULT_MAX_NEW_TOKENS = 100
+    
+    # Tasks that only want one sentence stop decoding at the first . ! or ?
+    STOP_AT_SENTENCE_END = frozenset({"<CAPTION>"})
+    
     def __init__(self):
         """Initialize Florence-2 detector with lazy loading."""
         self.model = None
@@ -56,11 +97,21 @@ class FlorenceDetector:
         self.dtype = None
         self._load_attempted = False
         self._load_error: Optional[str] = None
+        self._load_lock = threading.Lock()
+        self._sentence_end = None
+        # Cleared if this Florence-2/transformers combination can't decode with a KV cache
+        self._use_kv_cache = True
+        # Set at load if the remote code exposes the internals _encode_images/_decode_task use
+        self._shared_encoder = False
     
     def _detect_device(self) -> Tuple[str, torch.dtype]:
         """Detect best available device and dtype."""
         if torch.cuda.is_available():
-            # NVIDIA GPU - float16 works well and saves memory
+            # NVIDIA GPU - bfloat16 halves memory like float16 but keeps float32's
+            # exponent range, so logits/softmax can't overflow. Pre-Ampere cards
+            # without bf16 support stay on float16.
+            if torch.cuda.is_bf16_supported():
+                return "cuda", torch.bfloat16
             return "cuda", torch.float16
         elif torch.backends.mps.is_available():
             # Apple Silicon (M1/M2) - must use float32 for Florence-2 compatibility
@@ -81,68 +132,228 @@ class FlorenceDetector:
         if self.model is not None:
             return True
         
-        # Already tried and failed - don't retry
-        if self._load_attempted:
-            return False
-        
-        self._load_attempted = True
-        
-        try:
-            from transformers import AutoProcessor, AutoModelForCausalLM, AutoConfig
-            import warnings
-            
-            # Suppress HuggingFace warnings during loading
-            warnings.filterwarnings("ignore", category=UserWarning)
-            
-            # Detect device
-            self.device, self.dtype = self._detect_device()
-            
-            logging.info(f"Loading Florence-2-base on {self.device} with {self.dtype}")
+        with self._load_lock:
+            # Double-check: another thread may have finished loading while we waited
+            if self.model is not None:
+                return True
             
-            # Load processor
-            self.processor = AutoProcessor.from_pretrained(
-                "microsoft/Florence-2-base",
-                trust_remote_code=True
-            )
+            # Already tried and failed - don't retry
+            if self._load_attempted:
+                return False
             
-            # Load config first and patch to avoid SDPA compatibility issues
-            config = AutoConfig.from_pretrained(
-                "microsoft/Florence-2-base",
-                trust_remote_code=True
-            )
-            config._attn_implementation = "eager"
+            self._load_attempted = True
             
-            # Load model - always load in float32 first, then convert if needed
-            self.model = AutoModelForCausalLM.from_pretrained(
-                "microsoft/Florence-2-base",
-                trust_remote_code=True,
-                config=config,
-                torch_dtype=torch.float32,  # Load in float32 first
+            try:
+                from transformers import AutoProcessor, AutoModelForCausalLM, AutoConfig
+                import warnings
+                
+                # Suppress HuggingFace warnings during loading
+                warnings.filterwarnings("ignore", category=UserWarning)
+                
+                # Detect device
+                self.device, self.dtype = self._detect_device()
+                
+                logging.info(f"Loading Florence-2-base on {self.device} with {self.dtype}")
+                
+                # Load processor
+                self.processor = AutoProcessor.from_pretrained(
+                    "microsoft/Florence-2-base",
+                    trust_remote_code=True
+                )
+                self._sentence_end = _sentence_end_criteria(self.processor.tokenizer)
+                
+                # Load model - always load in float32 first, then convert if needed.
+                # Try fused attention first; older transformers/Florence-2 code rejects
+                # it when the model is built, so fall back down the list to "eager".
+                for attn_implementation in self._attn_implementations():
+                    config = AutoConfig.from_pretrained(
+                        "microsoft/Florence-2-base",
+                        trust_remote_code=True
+                    )
+                    config._attn_implementation = attn_implementation
+                    try:
+                        model = AutoModelForCausalLM.from_pretrained(
+                            "microsoft/Florence-2-base",
+                            trust_remote_code=True,
+                            config=config,
+                            torch_dtype=torch.float32,  # Load in float32 first
+                        )
+                        break
+                    except Exception as attn_err:
+                        # The remote code reports unsupported backends inconsistently
+                        # (ValueError, ImportError, or AttributeError on '_supports_sdpa'),
+                        # so any failure of a fused backend falls through to the next one
+                        if attn_implementation == "eager":
+                            raise
+                        logging.warning(
+                            f"Florence-2 rejected {attn_implementation} attention "
+                            f"({type(attn_err).__name__}): {attn_err}"
+                        )
+                logging.info(f"Florence-2-base using {attn_implementation} attention")
+                
+                # Move to device first
+                model = model.to(self.device)
+                
+                # Then convert dtype if not float32 (CUDA can use bfloat16/float16)
+                if self.dtype != torch.float32:
+                    try:
+                        model = model.to(dtype=self.dtype)
+                    except Exception as dtype_err:
+                        logging.warning(f"Could not convert to {self.dtype}, keeping float32: {dtype_err}")
+                        self.dtype = torch.float32
+                
+                model.eval()
+                self._patch_cache_handling(model)
+                
+                if self.device == "cuda":
+                    self._compile_vision_tower(model)
+                
+                self._shared_encoder = self._supports_shared_encoder(model)
+                
+                # Publish only once fully prepared, so the unlocked fast path never sees a half-loaded model
+                self.model = model
+                
+                logging.info(f"Florence-2-base loaded successfully on {self.device} with {self.dtype}")
+                return True
+                
+            except Exception as e:
+                self._load_error = str(e)
+                logging.error(f"Failed to load Florence-2-base: {e}")
+                logging.error(traceback.format_exc())
+                self.model = None
+                self.processor = None
+                return False
+    
+    def _supports_shared_encoder(self, model) -> bool:
+        """
+        Whether one vision encoder pass can feed several task prompts.
+        
+        That path calls private Florence-2 remote code, which a model or transformers
+        revision may rename; without it every prompt goes through the public
+        processor + generate path, which re-encodes the image per prompt.
+        """
+        missing = [
+            name for owner, name in (
+                (model, "_encode_image"),
+                (model, "_merge_input_ids_with_image_features"),
+                (self.processor, "_construct_prompts"),
             )
-            
-            # Move to device first
-            self.model = self.model.to(self.device)
-            
-            # Then convert dtype if not float32 (CUDA can use float16)
-            if self.dtype != torch.float32:
-                try:
-                    self.model = self.model.to(dtype=self.dtype)
-                except Exception as dtype_err:
-                    logging.warning(f"Could not convert to {self.dtype}, keeping float32: {dtype_err}")
-                    self.dtype = torch.float32
-            
-            self.model.eval()
-            
-            logging.info(f"Florence-2-base loaded successfully on {self.device} with {self.dtype}")
-            return True
-            
-        except Exception as e:
-            self._load_error = str(e)
-            logging.error(f"Failed to load Florence-2-base: {e}")
-            logging.error(traceback.format_exc())
-            self.model = None
-            self.processor = None
+            if not hasattr(owner, name)
+        ]
+        if missing:
+            logging.warning(f"Florence-2 internals missing ({', '.join(missing)}), encoding per prompt")
             return False
+        return True
+    
+    def _attn_implementations(self) -> List[str]:
+        """Attention backends to try, fastest first; "eager" always works."""
+        candidates = []
+        if self.device == "cuda" and self.dtype != torch.float32:
+            if importlib.util.find_spec("flash_attn") is not None:
+                candidates.append("flash_attention_2")
+        try:
+            import transformers
+            from packaging import version
+            if version.parse(transformers.__version__) >= version.parse("4.45"):
+                candidates.append("sdpa")
+        except ImportError:
+            pass
+        candidates.append("eager")
+        return candidates
+    
+    def _patch_cache_handling(self, model) -> None:
+        """
+        Let Florence-2's decoder accept the empty cache newer transformers pass on step one.
+        
+        The remote code reads past_key_values[0][0].shape as a legacy tuple, which fails
+        with 'NoneType' on an empty Cache object. Treating that as "no cache yet" makes
+        use_cache=True work, so each step reuses K/V instead of re-running the prefix.
+        """
+        language_model = getattr(model, "language_model", None)
+        if language_model is None:
+            return
+        original = language_model.prepare_inputs_for_generation
+        
+        def prepare_inputs_for_generation(decoder_input_ids, past_key_values=None, **kwargs):
+            if past_key_values is not None and hasattr(past_key_values, "get_seq_length"):
+                if past_key_values.get_seq_length() == 0:
+                    past_key_values = None
+            return original(decoder_input_ids, past_key_values=past_key_values, **kwargs)
+        
+        language_model.prepare_inputs_for_generation = prepare_inputs_for_generation
+    
+    def _generate(self, inputs: dict, max_new_tokens: int, stopping_criteria=None) -> torch.Tensor:
+        """Greedy decoding, with KV cache unless this Florence-2 build rejects it."""
+        generate_kwargs = dict(
+            max_new_tokens=max_new_tokens,
+            num_beams=1,
+            do_sample=False,
+            # Rows that hit EOS are padded while the rest of the batch finishes
+            pad_token_id=self.processor.tokenizer.pad_token_id,
+        )
+        if stopping_criteria is not None:
+            generate_kwargs["stopping_criteria"] = stopping_criteria
+        if self._use_kv_cache:
+            try:
+                return self.model.generate(**inputs, **generate_kwargs, use_cache=True)
+            except (AttributeError, TypeError) as e:
+                logging.warning(f"Florence-2 KV cache unavailable, decoding without it: {e}")
+                self._use_kv_cache = False
+        return self.model.generate(**inputs, **generate_kwargs, use_cache=False)
+    
+    def _inference_context(self) -> ExitStack:
+        """inference_mode, plus autocast when the model runs in reduced precision."""
+        stack = ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self.dtype != torch.float32:
+            # Only CUDA runs below float32; catches any op that would mix dtypes
+            stack.enter_context(torch.autocast(device_type=self.device, dtype=self.dtype))
+        return stack
+    
+    def _compile_vision_tower(self, model) -> None:
+        """Compile the DaViT image encoder, keeping eager mode if the warm-up fails."""
+        vision_tower = getattr(model, "vision_tower", None)
+        if vision_tower is None or not hasattr(torch, "compile"):
+            return
+        
+        # The processor always yields 768x768 pixels, so the encoder compiles once
+        # per batch size. Default mode, not reduce-overhead: every scan worker shares
+        # this model, and CUDA graph outputs are overwritten by the next replay.
+        # The decoder's sequence grows every step, so generate() itself stays eager.
+        eager_forward = vision_tower.forward_features_unpool
+        vision_tower.forward_features_unpool = torch.compile(eager_forward, dynamic=False)
+        try:
+            # Warm up here so the first photo doesn't pay the compile cost
+            warmup = self.processor(
+                text="<CAPTION>",
+                images=Image.new("RGB", (768, 768)),
+                return_tensors="pt"
+            )["pixel_values"]
+            with self._inference_context():
+                vision_tower.forward_features_unpool(warmup.to(device=self.device, dtype=self.dtype))
+        except Exception as e:
+            logging.warning(f"torch.compile failed for Florence-2 vision tower, using eager: {e}")
+            vision_tower.forward_features_unpool = eager_forward
+    
+    def _load_image(self, image_path: str) -> Image.Image:
+        """
+        Decode an image from disk, capped at 1024px to prevent memory issues.
+        
+        Only a fallback for callers without an ImageCache image; detect_batch
+        decodes each path once and shares it across both task prompts.
+        """
+        max_size = 1024
+        image = Image.open(image_path)
+        # Let JPEG decode at a reduced DCT scale that still covers max_size
+        image.draft('RGB', (max_size, max_size))
+        image = image.convert('RGB')
+        
+        if max(image.size) > max_size:
+            ratio = max_size / max(image.size)
+            new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
+            # The processor resamples to 768px anyway, so bilinear loses nothing visible
+            image = image.resize(new_size, Image.Resampling.BILINEAR)
+        return image
     
     def _run_task(
         self, 
@@ -161,74 +372,136 @@ class FlorenceDetector:
         Returns:
             Generated text output
         """
+        return self._run_tasks_batch([image_path], [task_prompt], [image_rgb])[0][0]
+    
+    def _run_tasks_batch(
+        self,
+        image_paths: List[str],
+        task_prompts: List[str],
+        images_rgb: Optional[List[Optional[Image.Image]]] = None
+    ) -> List[List[str]]:
+        """
+        Run Florence-2 tasks over several images, encoding each image only once.
+        
+        The vision encoder runs once for the whole batch and its features feed one
+        batched generate per task prompt. Every row of a generate call shares the
+        same prompt, so the token inputs line up without padding. Without the
+        Florence-2 internals that needs, each prompt re-encodes via _process_task.
+        
+        Args:
+            image_paths: Paths to images (for logging / loading missing images)
+            task_prompts: Task prompts (e.g., "<CAPTION>", "<DETAILED_CAPTION>")
+            images_rgb: Optional pre-decoded PIL RGB images, None entries are loaded from disk
+        
+        Returns:
+            Per task prompt, the generated text per image ("" everywhere on failure)
+        """
+        empty = [[""] * len(image_paths) for _ in task_prompts]
+        
         # Try to load model if not already loaded
         if not self._load_model():
             # Model failed to load, return empty gracefully
-            return ""
+            return empty
+        
+        if self.model is None or self.processor is None or not image_paths:
+            return empty
         
-        if self.model is None or self.processor is None:
-            return ""
+        if images_rgb is None:
+            images_rgb = [None] * len(image_paths)
         
         try:
-            # Use pre-decoded image if provided, otherwise load from disk
-            if image_rgb is not None:
-                image = image_rgb
-            else:
-                image = Image.open(image_path).convert('RGB')
-                
-                # Resize large images to prevent memory issues
-                max_size = 1024
-                if max(image.size) > max_size:
-                    ratio = max_size / max(image.size)
-                    new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
-                    image = image.resize(new_size, Image.Resampling.LANCZOS)
+            # Use pre-decoded images if provided, otherwise load from disk
+            images = [
+                image if image is not None else self._load_image(path)
+                for path, image in zip(image_paths, images_rgb)
+            ]
             
-            # Prepare inputs
-            inputs = self.processor(
-                text=task_prompt,
-                images=image,
-                return_tensors="pt"
-            )
-            
-            # Move inputs to device and cast floating point tensors to model dtype
-            processed_inputs = {}
-            for k, v in inputs.items():
-                if isinstance(v, torch.Tensor):
-                    if v.is_floating_point():
-                        # Pixel values need to match model dtype
-                        processed_inputs[k] = v.to(device=self.device, dtype=self.dtype)
-                    else:
-                        # Integer tensors (input_ids, attention_mask) - device only
-                        processed_inputs[k] = v.to(device=self.device)
-                else:
-                    processed_inputs[k] = v
-            inputs = processed_inputs
-            
-            # Generate using greedy decoding with cache disabled
-            # use_cache=False is required to avoid 'NoneType' error in prepare_inputs_for_generation
-            with torch.no_grad():
-                generated_ids = self.model.generate(
-                    **inputs,
-                    max_new_tokens=100,
-                    num_beams=1,
-                    do_sample=False,
-                    use_cache=False,  # Required to avoid KV cache bug in Florence-2
-                )
-            
-            # Decode
-            generated_text = self.processor.batch_decode(
-                generated_ids,
-                skip_special_tokens=True
-            )[0]
-            
-            # Clean output (remove task prompt if echoed)
-            generated_text = generated_text.replace(task_prompt, "").strip()
+            if not self._shared_encoder:
+                return [self._process_task(images, task_prompt) for task_prompt in task_prompts]
             
-            return generated_text
+            image_features = self._encode_images(images)
+            return [self._decode_task(image_features, task_prompt) for task_prompt in task_prompts]
             
         except Exception as e:
-            logging.error(f"Florence-2 task '{task_prompt}' failed for {image_path}: {e}")
-            return ""
+            logging.error(f"Florence-2 tasks {task_prompts} failed for {', '.join(image_paths)}: {e}")
+            return empty
+    
+    def _encode_images(self, images: List[Image.Image]) -> torch.Tensor:
+        """Run the vision encoder once; the features can serve any number of task prompts."""
+        pixel_values = self.processor.image_processor(images, return_tensors="pt")["pixel_values"]
+        if self.device == "cuda":
+            # Page-locked staging makes the copy truly async; the encoder queues behind it
+            pixel_values = pixel_values.pin_memory()
+        # Pixel values need to match model dtype (cast after the copy lands on the device)
+        pixel_values = pixel_values.to(self.device, non_blocking=True).to(self.dtype)
+        with self._inference_context():
+            return self.model._encode_image(pixel_values)
+    
+    def _decode_task(self, image_features: torch.Tensor, task_prompt: str) -> List[str]:
+        """Generate text for task_prompt from precomputed image features, one row per image."""
+        # Same prompt expansion the processor applies ("<CAPTION>" -> "What does the image describe?")
+        prompts = self.processor._construct_prompts([task_prompt] * image_features.shape[0])
+        input_ids = self.processor.tokenizer(prompts, return_tensors="pt")["input_ids"].to(device=self.device)
+        
+        # Generate using greedy decoding
+        with self._inference_context():
+            inputs_embeds = self.model.get_input_embeddings()(input_ids)
+            inputs_embeds, _ = self.model._merge_input_ids_with_image_features(image_features, inputs_embeds)
+            generated_ids = self._generate(
+                {"input_ids": None, "inputs_embeds": inputs_embeds},
+                self.MAX_NEW_TOKENS.get(task_prompt, self.DEFAULT_MAX_NEW_TOKENS),
+                self._sentence_end if task_prompt in self.STOP_AT_SENTENCE_END else None
+            )
+        
+        return self._decode_generated(generated_ids, task_prompt)
+    
+    def _process_task(self, images: List[Image.Image], task_prompt: str) -> List[str]:
+        """Generate text for task_prompt through the public processor + generate API."""
+        inputs = self.processor(
+            text=[task_prompt] * len(images),
+            images=images,
+            return_tensors="pt"
+        )
+        
+        # Move inputs to device and cast floating point tensors to model dtype
+        processed_inputs = {}
+        for k, v in inputs.items():
+            if isinstance(v, torch.Tensor):
+                if v.is_floating_point():
+                    # Pixel values need to match model dtype
+                    processed_inputs[k] = v.to(device=self.device, dtype=self.dtype)
+                else:
+                    # Integer tensors (input_ids, attention_mask) - device only
+                    processed_inputs[k] = v.to(device=self.device)
+            else:
+                processed_inputs[k] = v
+        
+        # Generate using greedy decoding
+        with self._inference_context():
+            generated_ids = self._generate(
+                processed_inputs,
+                self.MAX_NEW_TOKENS.get(task_prompt, self.DEFAULT_MAX_NEW_TOKENS),
+                self._sentence_end if task_prompt in self.STOP_AT_SENTENCE_END else None
+            )
+        
+        return self._decode_generated(generated_ids, task_prompt)
+    
+    def _decode_generated(self, generated_ids: torch.Tensor, task_prompt: str) -> List[str]:
+        """Decode generated token ids into one cleaned string per row."""
+        generated_texts = self.processor.batch_decode(
+            generated_ids,
+            skip_special_tokens=True
+        )
+        
+        # Clean output (remove task prompt if echoed)
+        return [text.replace(task_prompt, "").strip() for text in generated_texts]
+    
+    @staticmethod
+    def _truncate(caption: str, max_length: int) -> str:
+        """Trim a caption to max_length characters, marking the cut with an ellipsis."""
+        if len(caption) > max_length:
+            caption = caption[:max_length - 3] + "..."
+        return caption
     
     def get_caption(
         self, 
@@ -238,6 +511,9 @@ class FlorenceDetector:
         """
         Get short caption for an image.
         
+        Slow path: runs a dedicated <CAPTION> generate. detect() derives its short
+        caption from the detailed caption instead.
+        
         Args:
             image_path: Path to image (for logging if image_rgb provided)
             image_rgb: Optional pre-decoded PIL RGB image (from ImageCache)
@@ -248,10 +524,7 @@ class FlorenceDetector:
         caption = self._run_task(image_path, "<CAPTION>", image_rgb=image_rgb)
         
         # Trim to reasonable length
-        if len(caption) > 200:
-            caption = caption[:197] + "..."
-        
-        return caption
+        return self._truncate(caption, 200)
     
     def get_detailed_caption(
         self, 
@@ -271,10 +544,7 @@ class FlorenceDetector:
         caption = self._run_task(image_path, "<DETAILED_CAPTION>", image_rgb=image_rgb)
         
         # Trim to reasonable length
-        if len(caption) > 500:
-            caption = caption[:497] + "..."
-        
-        return caption
+        return self._truncate(caption, 500)
     
     def extract_tags(self, caption: str) -> List[str]:
         """
@@ -289,30 +559,18 @@ class FlorenceDetector:
         if not caption:
             return []
         
-        # Convert to lowercase
-        caption = caption.lower()
-        
-        # Extract words (alphanumeric only)
-        words = re.findall(r'\b[a-z]+\b', caption)
-        
-        # Filter stopwords, generic tags, and short words
-        meaningful_words = [
-            w for w in words 
-            if w not in self.STOPWORDS 
-            and w not in self.GENERIC_TAGS
-            and len(w) > 2
-        ]
-        
-        # Deduplicate while preserving order
+        # Filter stopwords, generic tags and short words, deduplicate while
+        # preserving order, and stop as soon as MAX_TAGS are collected
         seen = set()
         tags = []
-        for word in meaningful_words:
-            if word not in seen:
+        for word in self._WORD_RE.findall(caption.lower()):
+            if len(word) > 2 and word not in self._EXCLUDED_WORDS and word not in seen:
                 seen.add(word)
                 tags.append(word)
+                if len(tags) == self.MAX_TAGS:
+                    break
         
-        # Limit to MAX_TAGS
-        return tags[:self.MAX_TAGS]
+        return tags
     
     def detect(
         self, 
@@ -331,23 +589,53 @@ class FlorenceDetector:
             - caption: Short caption string
             - tags: List of extracted tags
         """
+        return self.detect_batch([image_path], [image_rgb])[0]
+    
+    def detect_batch(
+        self,
+        image_paths: List[str],
+        images_rgb: Optional[List[Optional[Image.Image]]] = None
+    ) -> List[Tuple[str, List[str]]]:
+        """
+        Full detection for several images, one batched generate per task prompt.
+        
+        Args:
+            image_paths: Paths to images (for logging / loading missing images)
+            images_rgb: Optional pre-decoded PIL RGB images (from ImageCache)
+        
+        Returns:
+            (caption, tags) tuple per image, in input order
+        """
+        empty = [("", [])] * len(image_paths)
+        if not self._load_model():
+            return empty
+        
         try:
-            # Get detailed caption for better tag extraction
-            detailed_caption = self.get_detailed_caption(image_path, image_rgb=image_rgb)
+            if images_rgb is None:
+                images_rgb = [None] * len(image_paths)
+            # Use pre-decoded images if provided, otherwise load from disk
+            images = [
+                image if image is not None else self._load_image(path)
+                for path, image in zip(image_paths, images_rgb)
+            ]
             
-            # Get short caption for storage
-            short_caption = self.get_caption(image_path, image_rgb=image_rgb)
+            # Detailed captions give better tag extraction; the stored short caption is
+            # their first sentence, which saves a whole generate pass per image
+            detailed_captions = self._run_tasks_batch(image_paths, ["<DETAILED_CAPTION>"], images)[0]
             
-            # Extract tags from detailed caption
-            tags = self.extract_tags(detailed_caption)
+            results = []
+            for image_path, detailed_caption in zip(image_paths, detailed_captions):
+                # Extract tags from detailed caption
+                tags = self.extract_tags(self._truncate(detailed_caption, 500))
+                logging.info(f"Florence-2 detected {len(tags)} tags for {image_path}")
+                short_caption = self._SENTENCE_END_RE.split(detailed_caption, maxsplit=1)[0]
+                results.append((self._truncate(short_caption, 200), tags))
             
-            logging.info(f"Florence-2 detected {len(tags)} tags for {image_path}")
-            
-            return short_caption, tags
+            return results
             
         except Exception as e:
-            logging.error(f"Florence-2 detection failed for {image_path}: {e}")
-            return "", []
+            logging.error(f"Florence-2 detection failed for {', '.join(image_paths)}: {e}")
+            return empty
     
     def get_scene_tags(
         self, 
@@ -383,3 +671,18 @@ class FlorenceDetector:
             results.append((tag, confidence))
         
         return results
+
+
+_default_detector = None
+_default_detector_lock = threading.Lock()
+
+
+def get_florence_detector() -> FlorenceDetector:
+    """Get the process-wide FlorenceDetector singleton. Thread-safe initialization."""
+    global _default_detector
+    if _default_detector is None:
+        with _default_detector_lock:
+            # Double-check locking pattern
+            if _default_detector is None:
+                _default_detector = FlorenceDetector()
+    return _default_detector
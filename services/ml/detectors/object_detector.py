@@ -2,10 +2,10 @@
 # Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
 """Object detection using YOLOv8."""
 
+import threading
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
-import cv2
 import numpy as np
 from ultralytics import YOLO
 
@@ -113,6 +113,9 @@ class ObjectDetector:
         "toothbrush": "item",
     }
 
+    # Images per YOLO forward pass in detect_batch
+    BATCH_SIZE = 8
+
     def __init__(self, confidence_threshold: float = 0.55, model_size: str = "n"):
         """
         Initialize object detector.
@@ -122,12 +125,98 @@ class ObjectDetector:
         self.confidence_threshold = confidence_threshold
         self.model_size = model_size
         self.model = None  # Lazy loading
+        self._load_lock = threading.Lock()
+        # YOLO class id -> "simplified:original" category / species, None if unmapped
+        self._id_to_category = {}
+        self._id_to_species = {}
 
     def _load_model(self) -> None:
-        """Lazy load YOLOv8 model."""
-        if self.model is None:
+        """Lazy load YOLOv8 model (once, even with concurrent callers)."""
+        if self.model is not None:
+            return
+        with self._load_lock:
+            if self.model is not None:
+                return
             model_name = f"yolov8{self.model_size}.pt"
-            self.model = YOLO(model_name)
+            model = self._tensorrt_engine(YOLO(model_name))
+            # Resolve every class id once so each box costs a single dict lookup
+            # Format: "simplified:original" (e.g., "plant:potted plant")
+            self._id_to_category = {
+                class_id: f"{self.CATEGORY_MAP[name]}:{name}" if name in self.CATEGORY_MAP else None
+                for class_id, name in model.names.items()
+            }
+            self._id_to_species = {
+                class_id: self.ANIMAL_CLASSES.get(name)
+                for class_id, name in model.names.items()
+            }
+            self.model = model
+
+    def _tensorrt_engine(self, model: YOLO) -> YOLO:
+        """
+        Swap the .pt checkpoint for an FP16 TensorRT engine on NVIDIA GPUs.
+        
+        The engine is exported once next to the checkpoint and reused afterwards.
+        Any failure (TensorRT missing, engine built for another GPU) keeps the
+        PyTorch model.
+        """
+        import logging
+        import torch
+        
+        if not torch.cuda.is_available():
+            return model
+        
+        try:
+            engine_path = Path(model.ckpt_path).with_suffix(".engine")
+            if not engine_path.exists():
+                logging.info(f"Exporting {engine_path.name} to TensorRT (one-time build)")
+                engine_path = Path(model.export(
+                    format="engine",
+                    half=True,
+                    imgsz=640,
+                    dynamic=True,
+                    batch=self.BATCH_SIZE,  # Largest batch detect_batch sends
+                    device=0,
+                    verbose=False,
+                ))
+            engine = YOLO(str(engine_path), task="detect")
+            # Engines load lazily; run one frame so a broken engine fails here, not per photo
+            engine(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+            return engine
+        except Exception as e:
+            logging.warning(f"TensorRT engine unavailable, using PyTorch YOLO: {e}")
+            return model
+
+    @staticmethod
+    def _to_original_xywh(xyxy: np.ndarray, scale_factor: float) -> List[List[int]]:
+        """Convert (x1, y1, x2, y2) rows to [x, y, w, h] ints in ORIGINAL image coordinates."""
+        corners = xyxy[:, :2].astype(np.int32)
+        sizes = (xyxy[:, 2:] - xyxy[:, :2]).astype(np.int32)
+        xywh = np.concatenate([corners, sizes], axis=1)
+        # Scale bbox back to original image coordinates
+        if scale_factor != 1.0:
+            xywh = (xywh * (1.0 / scale_factor)).astype(np.int32)
+        return xywh.tolist()
+
+    def _postprocess(
+        self,
+        result,
+        scale_factor: float,
+        labels: Dict[int, Optional[str]]
+    ) -> List[Tuple[int, int, int, int, str, float]]:
+        """Extract (x, y, width, height, label, confidence) for one YOLO result, skipping unlabelled classes."""
+        # One device->host transfer per field instead of several per box
+        boxes = result.boxes
+        class_ids = boxes.cls.cpu().numpy().astype(np.int32)
+        confidences = boxes.conf.cpu().numpy()
+        xywh = self._to_original_xywh(boxes.xyxy.cpu().numpy(), scale_factor)
+        
+        detections = []
+        for (x, y, width, height), confidence, class_id in zip(xywh, confidences.tolist(), class_ids.tolist()):
+            label = labels[class_id]
+            if label is None:
+                continue
+            detections.append((x, y, width, height, label, confidence))
+        return detections
 
     def detect(
         self, 
@@ -161,42 +250,61 @@ class ObjectDetector:
             return []
 
         detections = []
-        inv_scale = 1.0 / scale_factor if scale_factor != 1.0 else 1.0
-        
         for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0].cpu().numpy())
-                class_id = int(box.cls[0].cpu().numpy())
-                class_name = self.model.names[class_id]
-
-                # Map to simplified category - skip if not in our category map
-                simplified_category = self.CATEGORY_MAP.get(class_name)
-                if simplified_category is None:
-                    continue  # Skip objects that don't match known categories
-
-                # Store both simplified category and original class name
-                # Format: "simplified:original" (e.g., "plant:potted plant")
-                category = f"{simplified_category}:{class_name}"
-
-                width = int(x2 - x1)
-                height = int(y2 - y1)
-                x1 = int(x1)
-                y1 = int(y1)
-                
-                # Scale bbox back to original image coordinates
-                if scale_factor != 1.0:
-                    x1 = int(x1 * inv_scale)
-                    y1 = int(y1 * inv_scale)
-                    width = int(width * inv_scale)
-                    height = int(height * inv_scale)
-                
-                detections.append((x1, y1, width, height, category, confidence))
+            # Store both simplified category and original class name -
+            # skip objects that don't match known categories
+            detections.extend(self._postprocess(result, scale_factor, self._id_to_category))
         
         logging.info(f"Detected {len(detections)} objects in {image_path}")
         return detections
 
+    def detect_batch(
+        self,
+        image_paths: List[str],
+        images_bgr: Optional[List[Optional[np.ndarray]]] = None,
+        scale_factors: Optional[List[float]] = None
+    ) -> List[List[Tuple[int, int, int, int, str, float]]]:
+        """
+        Detect objects in several images, BATCH_SIZE images per YOLO forward pass.
+        
+        Args:
+            image_paths: Paths to images (used where images_bgr has no entry)
+            images_bgr: Optional pre-decoded BGR images (from ImageCache)
+            scale_factors: Per-image scale factors to map bboxes back to original coordinates
+        
+        Returns one detect()-style list per image, in input order.
+        """
+        import logging
+        
+        self._load_model()
+        
+        if images_bgr is None:
+            images_bgr = [None] * len(image_paths)
+        if scale_factors is None:
+            scale_factors = [1.0] * len(image_paths)
+        
+        # Use pre-decoded images where provided
+        sources = [
+            image if image is not None else path
+            for path, image in zip(image_paths, images_bgr)
+        ]
+        
+        all_detections = []
+        for start in range(0, len(sources), self.BATCH_SIZE):
+            batch = slice(start, start + self.BATCH_SIZE)
+            try:
+                results = self.model(sources[batch], conf=self.confidence_threshold, verbose=False)
+            except Exception as e:
+                logging.error(f"Object detection failed for {', '.join(image_paths[batch])}: {e}")
+                all_detections.extend([] for _ in image_paths[batch])
+                continue
+            
+            for result, scale_factor in zip(results, scale_factors[batch]):
+                all_detections.append(self._postprocess(result, scale_factor, self._id_to_category))
+        
+        logging.info(f"Detected {sum(map(len, all_detections))} objects in {len(image_paths)} images")
+        return all_detections
+
     def detect_animals(
         self, 
         image_path: str, 
@@ -233,35 +341,24 @@ class ObjectDetector:
             return []
 
         detections = []
-        inv_scale = 1.0 / scale_factor if scale_factor != 1.0 else 1.0
-        
         for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                class_id = int(box.cls[0].cpu().numpy())
-                class_name = self.model.names[class_id]
-                
-                # Only keep animal classes
-                if class_name not in self.ANIMAL_CLASSES:
-                    continue
-                
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0].cpu().numpy())
-                species = self.ANIMAL_CLASSES[class_name]
-                
-                width = int(x2 - x1)
-                height = int(y2 - y1)
-                x1 = int(x1)
-                y1 = int(y1)
-                
-                # Scale bbox back to original image coordinates
-                if scale_factor != 1.0:
-                    x1 = int(x1 * inv_scale)
-                    y1 = int(y1 * inv_scale)
-                    width = int(width * inv_scale)
-                    height = int(height * inv_scale)
-                
-                detections.append((x1, y1, width, height, species, confidence))
+            # Only keep animal classes
+            detections.extend(self._postprocess(result, scale_factor, self._id_to_species))
         
         logging.info(f"Detected {len(detections)} animals in {image_path}")
         return detections
+
+
+_default_detector = None
+_default_detector_lock = threading.Lock()
+
+
+def get_object_detector() -> ObjectDetector:
+    """Get the process-wide ObjectDetector singleton. Thread-safe initialization."""
+    global _default_detector
+    if _default_detector is None:
+        with _default_detector_lock:
+            # Double-check locking pattern
+            if _default_detector is None:
+                _default_detector = ObjectDetector()
+    return _default_detector
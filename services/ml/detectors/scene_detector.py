@@ -2,15 +2,37 @@
 # Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
 """Scene detection using Places365-CNN."""
 
+from functools import cache
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import FrozenSet, List, Tuple, Optional
 import logging
+import threading
 
 import torch
 import torch.nn as nn
 from torchvision import transforms
 from PIL import Image
-import numpy as np
+
+
+_LOCAL_LABELS_PATH = Path(__file__).parent / "places365_labels.txt"
+
+
+def _parse_label(line: str) -> str:
+    """Format: "/a/airfield 0" -> "airfield"."""
+    label = line.strip().split(' ')[0]
+    # Remove leading "/a/", "/b/", etc.
+    if label.startswith('/'):
+        label = label.split('/', 2)[-1]  # Get everything after "/x/"
+    return label
+
+
+@cache
+def _local_labels() -> Tuple[str, ...]:
+    """Places365 labels from the bundled file, parsed once per process."""
+    return tuple(
+        _parse_label(line)
+        for line in _LOCAL_LABELS_PATH.read_text(encoding="utf-8").splitlines()
+    )
 
 
 class SceneDetector:
@@ -38,6 +60,9 @@ class SceneDetector:
         'sky': ['sky', 'sky/sunset', 'sky/sunrise', 'sky/night'],
     }
 
+    OUTDOOR_KEYWORDS = ('outdoor', 'outside', 'exterior')
+    INDOOR_KEYWORDS = ('indoor', 'inside', 'interior', 'room')
+
     def __init__(self, confidence_threshold: float = 0.1):
         """
         Initialize scene detector.
@@ -48,7 +73,16 @@ class SceneDetector:
         self.confidence_threshold = confidence_threshold
         self.model = None
         self.labels = None
+        # Per-label keyword matches, computed once when the labels load
+        self._label_tags: List[FrozenSet[str]] = []
+        self._label_category_ranks: List[Optional[int]] = []
+        self._label_sides: List[Optional[str]] = []
+        # Top-level scene name of each label ('beach/sandy' -> 'beach')
+        self._label_roots: List[str] = []
+        # RELEVANT_SCENES categories in declaration order (indexed by rank)
+        self._category_names: Tuple[str, ...] = tuple(self.RELEVANT_SCENES)
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._load_lock = threading.Lock()
         
         # Standard Places365 preprocessing
         self.transform = transforms.Compose([
@@ -65,7 +99,13 @@ class SceneDetector:
         """Lazy load Places365 model with offline fallback."""
         if self.model is not None:
             return
-            
+        with self._load_lock:
+            # Double-check: another thread may have finished loading while we waited
+            if self.model is None:
+                self._load_model_locked()
+
+    def _load_model_locked(self) -> None:
+        """Load the model and labels; caller holds _load_lock."""
         try:
             # Try loading from torch hub with local cache
             import os
@@ -75,7 +115,7 @@ class SceneDetector:
             
             # Silence torch hub's noisy "Using cache found ..." output when cached.
             try:
-                self.model = torch.hub.load(
+                model = torch.hub.load(
                     'CSAILVision/places365',
                     'resnet50',
                     pretrained=True,
@@ -84,46 +124,30 @@ class SceneDetector:
                 )
             except TypeError:
                 # Older torch versions may not support verbose=
-                self.model = torch.hub.load(
+                model = torch.hub.load(
                     'CSAILVision/places365',
                     'resnet50',
                     pretrained=True,
                     skip_validation=True
                 )
-            self.model.eval()
-            self.model.to(self.device)
+            model.eval()
+            model.to(self.device)
             
             # Load scene labels with offline fallback
             import urllib.request
-            local_labels_path = Path(__file__).parent / "places365_labels.txt"
             
             # First try local file (faster and more reliable)
-            if local_labels_path.exists():
-                with open(local_labels_path, "r", encoding="utf-8") as f:
-                    self.labels = []
-                    for line in f.readlines():
-                        # Format: "/a/airfield 0" -> "airfield"
-                        parts = line.strip().split(' ')
-                        if parts:
-                            label = parts[0]
-                            # Remove leading "/a/", "/b/", etc.
-                            if label.startswith('/'):
-                                label = label.split('/', 2)[-1]  # Get everything after "/x/"
-                            self.labels.append(label)
+            if _LOCAL_LABELS_PATH.exists():
+                self.labels = _local_labels()
                 logging.info(f"Loaded {len(self.labels)} Places365 labels from local file")
             else:
                 # Fallback to URL if local file doesn't exist
                 label_url = 'https://raw.githubusercontent.com/csailvision/places365/master/categories_places365.txt'
                 try:
                     with urllib.request.urlopen(label_url, timeout=10) as response:
-                        self.labels = []
-                        for line in response.readlines():
-                            parts = line.decode('utf-8').strip().split(' ')
-                            if parts:
-                                label = parts[0]
-                                if label.startswith('/'):
-                                    label = label.split('/', 2)[-1]
-                                self.labels.append(label)
+                        self.labels = [
+                            _parse_label(line.decode('utf-8')) for line in response.readlines()
+                        ]
                 except Exception as e:
                     logging.warning(f"Could not load Places365 labels: {e}")
                     self.labels = [f"scene_{i}" for i in range(365)]
@@ -131,6 +155,9 @@ class SceneDetector:
                     # Ultimate fallback: create minimal labels
                     self.labels = [f"scene_{i}" for i in range(365)]
                 
+            self._index_labels()
+            # Publish last so concurrent callers never see the model without its labels
+            self.model = model
             logging.info("Places365 scene detector loaded successfully")
             
         except Exception as e:
@@ -139,23 +166,36 @@ class SceneDetector:
             self.model = None
             self.labels = []
 
-    def detect(
-        self, 
-        image_path: str, 
-        top_k: int = 5,
+    def _index_labels(self) -> None:
+        """Resolve RELEVANT_SCENES and indoor/outdoor keywords for every label once."""
+        categories = list(self.RELEVANT_SCENES.items())
+        self._label_tags = []
+        self._label_category_ranks = []
+        self._label_sides = []
+        self._label_roots = []
+        for label in self.labels:
+            label_lower = label.lower()
+            self._label_roots.append(label.split('/')[0])
+            matches = [
+                rank for rank, (_, keywords) in enumerate(categories)
+                if any(keyword in label_lower for keyword in keywords)
+            ]
+            self._label_tags.append(frozenset(categories[rank][0] for rank in matches))
+            self._label_category_ranks.append(matches[0] if matches else None)
+            if any(kw in label_lower for kw in self.OUTDOOR_KEYWORDS):
+                self._label_sides.append('outdoor')
+            elif any(kw in label_lower for kw in self.INDOOR_KEYWORDS):
+                self._label_sides.append('indoor')
+            else:
+                self._label_sides.append(None)
+
+    def _predict(
+        self,
+        image_path: str,
+        top_k: int,
         image_rgb: Optional[Image.Image] = None
-    ) -> List[Tuple[str, float]]:
-        """
-        Detect scenes in an image.
-        
-        Args:
-            image_path: Path to image file (for logging, if image_rgb provided)
-            top_k: Number of top predictions to return
-            image_rgb: Optional pre-decoded PIL RGB image (from ImageCache)
-            
-        Returns:
-            List of (scene_label, confidence) tuples
-        """
+    ) -> List[Tuple[int, float]]:
+        """Run the model and return (label_index, confidence) pairs above threshold."""
         self._load_model()
         
         # If model failed to load, return empty list gracefully
@@ -170,30 +210,54 @@ class SceneDetector:
             else:
                 img = Image.open(image_path).convert('RGB')
             
-            img_tensor = self.transform(img).unsqueeze(0).to(self.device)
+            img_tensor = self.transform(img).unsqueeze(0)
+            if self.device == "cuda":
+                # Page-locked staging makes the copy truly async
+                img_tensor = img_tensor.pin_memory()
+            img_tensor = img_tensor.to(self.device, non_blocking=True)
             
-            # Get predictions
-            with torch.no_grad():
-                logits = self.model(img_tensor)
-                probs = torch.nn.functional.softmax(logits, dim=1)
-                probs = probs.cpu().numpy()[0]
+            # Get top predictions on-device; only k scores and indices cross back
+            with torch.inference_mode():
+                logits = self.model(img_tensor)[0]
+                # Softmax is monotonic, so rank the raw logits and only turn the k
+                # survivors into probabilities against the log-normalizer
+                top_logits, top_indices = torch.topk(logits, k=min(top_k, logits.shape[0]))
+                top_probs = torch.exp(top_logits - torch.logsumexp(logits, dim=0))
+                top_probs = top_probs.cpu().tolist()
+                top_indices = top_indices.cpu().tolist()
             
-            # Get top predictions
-            top_indices = np.argsort(probs)[::-1][:top_k]
+            predictions = [
+                (idx, confidence)
+                for idx, confidence in zip(top_indices, top_probs)
+                if confidence >= self.confidence_threshold
+            ]
             
-            scenes = []
-            for idx in top_indices:
-                confidence = float(probs[idx])
-                if confidence >= self.confidence_threshold:
-                    scene_label = self.labels[idx]
-                    scenes.append((scene_label, confidence))
-            
-            logging.info(f"Detected {len(scenes)} scenes in {image_path}")
-            return scenes
+            logging.info(f"Detected {len(predictions)} scenes in {image_path}")
+            return predictions
             
         except Exception as e:
             logging.error(f"Scene detection failed for {image_path}: {e}")
             return []
+
+    def detect(
+        self, 
+        image_path: str, 
+        top_k: int = 5,
+        image_rgb: Optional[Image.Image] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Detect scenes in an image.
+        
+        Args:
+            image_path: Path to image file (for logging, if image_rgb provided)
+            top_k: Number of top predictions to return
+            image_rgb: Optional pre-decoded PIL RGB image (from ImageCache)
+            
+        Returns:
+            List of (scene_label, confidence) tuples
+        """
+        predictions = self._predict(image_path, top_k, image_rgb=image_rgb)
+        return [(self.labels[idx], confidence) for idx, confidence in predictions]
     
     def get_primary_scene(
         self, 
@@ -210,20 +274,24 @@ class SceneDetector:
         Returns:
             (scene_category, confidence) - e.g., ('sunset', 0.85)
         """
-        scenes = self.detect(image_path, top_k=10, image_rgb=image_rgb)
+        predictions = self._predict(image_path, top_k=10, image_rgb=image_rgb)
         
-        if not scenes:
+        if not predictions:
             return ('unknown', 0.0)
         
-        # Check for relevant scene categories
-        for category, keywords in self.RELEVANT_SCENES.items():
-            for scene_label, confidence in scenes:
-                for keyword in keywords:
-                    if keyword in scene_label.lower():
-                        return (category, confidence)
+        # First RELEVANT_SCENES category (in declaration order) matched by any
+        # scene, reported with the confidence of the best scene matching it
+        ranks = [self._label_category_ranks[idx] for idx, _ in predictions]
+        best_rank = min((rank for rank in ranks if rank is not None), default=None)
+        if best_rank is not None:
+            category = self._category_names[best_rank]
+            for idx, confidence in predictions:
+                if category in self._label_tags[idx]:
+                    return (category, confidence)
         
         # If no match, return the highest confidence scene
-        return (scenes[0][0].split('/')[0], scenes[0][1])
+        idx, confidence = predictions[0]
+        return (self._label_roots[idx], confidence)
     
     def get_all_scene_tags(
         self, 
@@ -240,32 +308,60 @@ class SceneDetector:
         Returns:
             List of scene category tags (e.g., ['sunset', 'beach', 'outdoor'])
         """
-        scenes = self.detect(image_path, top_k=10, image_rgb=image_rgb)
+        predictions = self._predict(image_path, top_k=10, image_rgb=image_rgb)
+        return self._scene_tags(predictions)
+    
+    def detect_with_tags(
+        self,
+        image_path: str,
+        top_k: int = 10,
+        image_rgb: Optional[Image.Image] = None
+    ) -> Tuple[List[Tuple[str, float]], List[str]]:
+        """
+        detect() and get_all_scene_tags() from a single forward pass.
         
-        if not scenes:
-            return []
+        Args:
+            image_path: Path to image file (for logging, if image_rgb provided)
+            top_k: Number of top predictions to return (get_all_scene_tags uses 10)
+            image_rgb: Optional pre-decoded PIL RGB image (from ImageCache)
         
-        tags = set()
+        Returns:
+            (detections, tags) - as returned by detect() and get_all_scene_tags()
+        """
+        predictions = self._predict(image_path, top_k, image_rgb=image_rgb)
+        detections = [(self.labels[idx], confidence) for idx, confidence in predictions]
+        return detections, self._scene_tags(predictions)
+    
+    def _scene_tags(self, predictions: List[Tuple[int, float]]) -> List[str]:
+        """Category tags plus an indoor/outdoor tag from the top 3 of (label_index, confidence) predictions."""
+        if not predictions:
+            return []
         
         # Map detected scenes to our categories
-        for scene_label, confidence in scenes:
-            scene_lower = scene_label.lower()
-            
-            for category, keywords in self.RELEVANT_SCENES.items():
-                for keyword in keywords:
-                    if keyword in scene_lower:
-                        tags.add(category)
-                        break
-        
-        # Add generic indoor/outdoor tag
-        outdoor_keywords = ['outdoor', 'outside', 'exterior']
-        indoor_keywords = ['indoor', 'inside', 'interior', 'room']
+        tags = set()
+        for idx, _ in predictions:
+            tags.update(self._label_tags[idx])
         
-        for scene_label, confidence in scenes[:3]:  # Check top 3
-            scene_lower = scene_label.lower()
-            if any(kw in scene_lower for kw in outdoor_keywords):
-                tags.add('outdoor')
-            elif any(kw in scene_lower for kw in indoor_keywords):
-                tags.add('indoor')
+        # Add generic indoor/outdoor tag from the top 3 scenes
+        for idx, _ in predictions[:3]:
+            side = self._label_sides[idx]
+            if side is not None:
+                tags.add(side)
         
-        return sorted(list(tags))
+        return sorted(tags)
+
+
+# Shared detector so every pipeline instance reuses one Places365 model
+_default_detector = None
+_default_detector_lock = threading.Lock()
+
+
+def get_scene_detector() -> SceneDetector:
+    """Get the process-wide SceneDetector singleton. Thread-safe initialization."""
+    global _default_detector
+    if _default_detector is None:
+        with _default_detector_lock:
+            # Double-check locking pattern
+            if _default_detector is None:
+                _default_detector = SceneDetector()
+    return _default_detector
@@ -2,11 +2,12 @@
 # Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
 """Face embedding generation using ArcFace (InsightFace)."""
 
-from typing import Optional
+import threading
+from typing import List
 
-import cv2
 import numpy as np
-from insightface.app import FaceAnalysis
+
+from services.ml.utils.onnx_providers import execution_providers
 
 
 class FaceEmbedder:
@@ -22,18 +23,31 @@ class FaceEmbedder:
         """
         self.model_name = model_name
         self.app = None  # Lazy loading
+        self._load_lock = threading.Lock()
         self.embedding_dim = 512  # ArcFace produces 512-dim embeddings
 
     def _load_model(self) -> None:
         """Lazy load the InsightFace model with recognition."""
-        if self.app is None:
+        if self.app is not None:
+            return
+        with self._load_lock:
+            # Double-check: another thread may have finished loading while we waited
+            if self.app is not None:
+                return
+            # InsightFace pulls in ONNX Runtime; import it only when a face is embedded
+            from insightface.app import FaceAnalysis
+
+            providers, ctx_id = execution_providers()
+
             # Load with recognition module for ArcFace embeddings
-            self.app = FaceAnalysis(
+            app = FaceAnalysis(
                 name=self.model_name,
                 allowed_modules=['detection', 'recognition'],  # Include recognition for embeddings
-                providers=['CPUExecutionProvider']
+                providers=providers
             )
-            self.app.prepare(ctx_id=-1, det_size=(640, 640))
+            app.prepare(ctx_id=ctx_id, det_size=(640, 640))
+            # Publish only after prepare() so concurrent callers never see an unprepared app
+            self.app = app
 
     def embed(self, face_image: np.ndarray) -> np.ndarray:
         """
@@ -62,18 +76,64 @@ class FaceEmbedder:
         # Normalize embedding (InsightFace may already normalize, but ensure it)
         embedding = embedding / (np.linalg.norm(embedding) + 1e-8)
         
-        return embedding.astype(np.float32)
+        return embedding.astype(np.float32, copy=False)
     
     def embed_aligned(self, aligned_face: np.ndarray) -> np.ndarray:
         """
-        Generate embedding from pre-aligned face (112x112 RGB).
+        Generate embedding from pre-aligned face (112x112 BGR).
         
         Args:
-            aligned_face: Pre-aligned face image (112x112, RGB or BGR)
+            aligned_face: Pre-aligned face image (112x112, BGR)
             
         Returns:
             512-dimensional normalized embedding vector
         """
-        # For pre-aligned faces, we still use InsightFace's full pipeline
-        # as it handles the alignment internally. This method is kept for API compatibility.
-        return self.embed(aligned_face)
+        return self.embed_aligned_batch([aligned_face])[0]
+    
+    def embed_aligned_batch(self, aligned_faces: List[np.ndarray]) -> np.ndarray:
+        """
+        Generate embeddings for pre-aligned faces in one ArcFace pass.
+        
+        Skips InsightFace's detector entirely - the chips are already aligned,
+        so only the recognition model runs, once for the whole batch.
+        
+        Args:
+            aligned_faces: Pre-aligned BGR face chips (resized to 112x112 if needed)
+            
+        Returns:
+            (N, 512) array of normalized embedding vectors
+        """
+        if not aligned_faces:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        
+        self._load_model()
+        
+        rec_model = self.app.models['recognition']
+        input_size = tuple(rec_model.input_size)  # (width, height)
+        chips = []
+        for face in aligned_faces:
+            if face.shape[1::-1] != input_size:
+                import cv2
+                face = cv2.resize(face, input_size)
+            chips.append(face)
+        
+        # get_feat does the (x - 127.5) / 127.5 blob conversion and BGR->RGB swap
+        embeddings = rec_model.get_feat(chips).astype(np.float32, copy=False)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8
+        return embeddings
+
+
+# Shared embedder so every pipeline instance reuses one set of ONNX sessions
+_default_embedder = None
+_default_embedder_lock = threading.Lock()
+
+
+def get_face_embedder() -> FaceEmbedder:
+    """Get the process-wide FaceEmbedder singleton. Thread-safe initialization."""
+    global _default_embedder
+    if _default_embedder is None:
+        with _default_embedder_lock:
+            # Double-check locking pattern
+            if _default_embedder is None:
+                _default_embedder = FaceEmbedder()
+    return _default_embedder
@@ -2,49 +2,127 @@
 # Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
 """Global image embedding for semantic search using CLIP."""
 
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import numpy as np
 import torch
+import torch.nn.functional as F
 from PIL import Image
+from torchvision import transforms
 from transformers import CLIPModel, CLIPProcessor
 
 
 class ImageEmbedder:
     """Generate image embeddings using CLIP for semantic search."""
 
+    # Images per CLIP forward pass in embed_pil_batch
+    BATCH_SIZE = 32
+
+    # Batch sizes the compiled image tower is specialized for; smaller batches are
+    # zero-padded up to the next bucket so only a handful of recompiles happen
+    BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+    TEXT_EMBEDDING_CACHE_SIZE = 4096  # Text embeddings kept for repeated queries and prompts
+
     def __init__(self, model_name: str = "openai/clip-vit-large-patch14"):
         """Initialize CLIP embedder with larger, more accurate model."""
         self.model_name = model_name
         self.model = None
         self.processor = None
+        self._preprocess = None
+        # GPU preprocessing (CUDA only): PIL resize/crop transform, mean/std tensors
+        self._gpu_preprocess = None
+        self._image_forward = None
+        self._load_lock = threading.Lock()
+        # LRU of text embeddings; CLIP is deterministic, so a text always maps to the same vector
+        self._text_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._text_embeddings_lock = threading.Lock()
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Half precision on GPU (tensor cores, half the VRAM); CPU stays in FP32
+        self.dtype = torch.float16 if self.device == "cuda" else torch.float32
         # CLIP large model has 768 dimensions (more expressive than base's 512)
         self.embedding_dim = 768
 
     def _load_model(self) -> None:
         """Lazy load CLIP model."""
-        if self.model is None:
-            self.model = CLIPModel.from_pretrained(self.model_name).to(self.device)
+        if self.model is not None:
+            return
+        with self._load_lock:
+            # Double-check: another thread may have finished loading while we waited
+            if self.model is not None:
+                return
+            model = CLIPModel.from_pretrained(self.model_name, torch_dtype=self.dtype).to(self.device)
+            model.eval()
             self.processor = CLIPProcessor.from_pretrained(self.model_name)
-            self.model.eval()
+            self._preprocess = self._build_preprocess(self.processor.image_processor)
+            image_forward = model.get_image_features
+            if self.device == "cuda":
+                self._gpu_preprocess = self._build_gpu_preprocess(self.processor.image_processor)
+                if hasattr(torch, "compile"):
+                    # Inputs are always fixed-size crops, so the image tower compiles once per
+                    # batch bucket. Default mode, not reduce-overhead: the scan workers share
+                    # this model, and CUDA graph outputs are overwritten by the next replay
+                    image_forward = self._warm_up_image_tower(
+                        model,
+                        torch.compile(model.get_image_features, dynamic=False),
+                    )
+            self._image_forward = image_forward
+            # Publish last so concurrent callers never see a half-prepared model
+            self.model = model
+
+    def _warm_up_image_tower(self, model, image_forward):
+        """Compile the single-image path now, so the first real photo isn't slow."""
+        crop = self.processor.image_processor.crop_size
+        dummy = torch.zeros((1, 3, crop["height"], crop["width"]), device=self.device, dtype=self.dtype)
+        try:
+            with torch.inference_mode():
+                image_forward(pixel_values=dummy)
+        except Exception as e:
+            import logging
+            logging.warning(f"Compiled CLIP image tower failed, using eager mode: {e}")
+            return model.get_image_features
+        return image_forward
+
+    @staticmethod
+    def _build_preprocess(image_processor) -> transforms.Compose:
+        """Build a fixed torchvision pipeline equivalent to the CLIP image processor."""
+        size = image_processor.size.get("shortest_edge", 224)
+        crop = image_processor.crop_size
+        return transforms.Compose([
+            transforms.Resize(size, interpolation=transforms.InterpolationMode.BICUBIC),
+            transforms.CenterCrop((crop["height"], crop["width"])),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=image_processor.image_mean, std=image_processor.image_std),
+        ])
+
+    def _build_gpu_preprocess(self, image_processor) -> tuple:
+        """Build the PIL resize/crop half of _preprocess plus (1, 3, 1, 1) mean/std tensors for the GPU half."""
+        size = image_processor.size.get("shortest_edge", 224)
+        crop = image_processor.crop_size
+        resize_crop = transforms.Compose([
+            transforms.Resize(size, interpolation=transforms.InterpolationMode.BICUBIC),
+            transforms.CenterCrop((crop["height"], crop["width"])),
+        ])
+        mean = torch.tensor(image_processor.image_mean, device=self.device).view(1, 3, 1, 1)
+        std = torch.tensor(image_processor.image_std, device=self.device).view(1, 3, 1, 1)
+        return resize_crop, mean, std
 
     def embed(self, image_path: str) -> np.ndarray:
         """
         Generate embedding for an image from file.
         Returns: 768-dimensional embedding vector (CLIP-Large).
         """
-        self._load_model()
-
         try:
             image = Image.open(image_path).convert("RGB")
-            return self._embed_pil_internal(image)
         except Exception as e:
             import logging
             logging.error(f"Image embedding failed for {image_path}: {e}")
             # Return zero vector as fallback
             return np.zeros(self.embedding_dim, dtype=np.float32)
+        return self.embed_pil_batch([image])[0]
 
     def embed_pil(self, image: Image.Image) -> np.ndarray:
         """
@@ -52,49 +130,99 @@ class ImageEmbedder:
         Used when image is already in memory (from ImageCache).
         Returns: 768-dimensional embedding vector (CLIP-Large).
         """
-        self._load_model()
+        return self.embed_pil_batch([image])[0]
 
+    def _pixel_values(self, images) -> torch.Tensor:
+        """Preprocess PIL image(s) into pixel values on the model's device and dtype."""
+        if isinstance(images, Image.Image):
+            images = [images]
+        images = [image if image.mode == "RGB" else image.convert("RGB") for image in images]
+        if self._gpu_preprocess is not None:
+            return self._pixel_values_gpu(images)
+        return torch.stack([self._preprocess(image) for image in images]).to(self.device).to(self.dtype)
+
+    def _pixel_values_gpu(self, images: List[Image.Image]) -> torch.Tensor:
+        """
+        Same pixel values as _preprocess, with the float conversion and normalize on the GPU.
+        Resize and center crop stay in PIL so embeddings match those already indexed;
+        only the uint8 crops cross PCIe, a quarter of the bytes of float32 crops.
+        """
+        resize_crop, mean, std = self._gpu_preprocess
+        crops = np.stack([np.asarray(resize_crop(image)) for image in images])
+        # Page-locked staging makes the copy truly async
+        pixels = torch.from_numpy(crops).pin_memory().to(self.device, non_blocking=True)
+        # (N, H, W, 3) uint8 -> (N, 3, H, W) in [0, 1], as ToTensor does
+        pixel_values = pixels.permute(0, 3, 1, 2).float().div_(255)
+        return pixel_values.sub_(mean).div_(std).to(self.dtype)
+
+    def _image_features(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        """Run the CLIP image tower, dropping back to eager mode if compilation fails."""
+        if self._image_forward == self.model.get_image_features:
+            return self._image_forward(pixel_values=pixel_values)
+
+        count = pixel_values.shape[0]
+        bucket = next((size for size in self.BATCH_BUCKETS if size >= count), count)
+        if bucket != count:
+            padding = pixel_values.new_zeros((bucket - count, *pixel_values.shape[1:]))
+            pixel_values = torch.cat([pixel_values, padding])
         try:
-            return self._embed_pil_internal(image)
+            return self._image_forward(pixel_values=pixel_values)[:count]
         except Exception as e:
             import logging
-            logging.error(f"PIL image embedding failed: {e}")
-            return np.zeros(self.embedding_dim, dtype=np.float32)
+            logging.warning(f"Compiled CLIP image tower failed, using eager mode: {e}")
+            self._image_forward = self.model.get_image_features
+            return self._image_forward(pixel_values=pixel_values[:count])
+
+    def embed_pil_batch(self, images: List[Optional[Image.Image]], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Generate embeddings for several pre-decoded PIL Images, batch_size images per forward pass.
+        Entries that are None (e.g. failed decodes) get a zero vector.
+        Returns: (N, 768) array of normalized embeddings (CLIP-Large).
+        """
+        self._load_model()
+
+        batch_size = batch_size or self.BATCH_SIZE
+        embeddings = np.zeros((len(images), self.embedding_dim), dtype=np.float32)
+        valid = [i for i, image in enumerate(images) if image is not None]
 
-    def _embed_pil_internal(self, image: Image.Image) -> np.ndarray:
-        """Internal method to embed a PIL image."""
-        inputs = self.processor(images=image, return_tensors="pt").to(self.device)
+        # On CUDA, results are copied asynchronously into one pinned buffer, so the CPU
+        # prepares the next batch while the GPU is still finishing the previous one
+        staging = None
+        if self.device == "cuda" and valid:
+            staging = torch.zeros((len(valid), self.embedding_dim), dtype=torch.float32, pin_memory=True)
 
-        with torch.no_grad():
-            image_features = self.model.get_image_features(**inputs)
-            embedding = image_features[0].cpu().numpy()
+        for start in range(0, len(valid), batch_size):
+            batch = valid[start:start + batch_size]
+            try:
+                pixel_values = self._pixel_values([images[i] for i in batch])
 
-        # Normalize
-        embedding = embedding / np.linalg.norm(embedding)
-        return embedding.astype(np.float32)
+                with torch.inference_mode():
+                    # Normalize on-device in FP32, then one transfer for the whole batch
+                    features = F.normalize(self._image_features(pixel_values).float(), dim=-1)
+                    if staging is None:
+                        embeddings[batch] = features.cpu().numpy()
+                    else:
+                        staging[start:start + len(batch)].copy_(features, non_blocking=True)
+            except Exception as e:
+                import logging
+                logging.error(f"Batch image embedding failed: {e}")
+
+        if staging is not None:
+            try:
+                # The copies are queued behind the forwards on the current stream; wait once
+                torch.cuda.current_stream().synchronize()
+                embeddings[valid] = staging.numpy()
+            except Exception as e:
+                import logging
+                logging.error(f"Batch image embedding failed: {e}")
+        return embeddings
 
     def embed_text(self, text: str) -> np.ndarray:
         """
         Generate embedding for text query.
         Returns: 768-dimensional embedding vector (CLIP-Large).
         """
-        self._load_model()
-
-        try:
-            inputs = self.processor(text=text, return_tensors="pt", padding=True).to(self.device)
-
-            with torch.no_grad():
-                text_features = self.model.get_text_features(**inputs)
-                embedding = text_features[0].cpu().numpy()
-
-            # Normalize
-            embedding = embedding / np.linalg.norm(embedding)
-            return embedding.astype(np.float32)
-        except Exception as e:
-            import logging
-            logging.error(f"Text embedding failed for '{text}': {e}")
-            # Return zero vector as fallback
-            return np.zeros(self.embedding_dim, dtype=np.float32)
+        return self.embed_texts_batch([text])[0]
 
     def embed_crop(self, image_crop: np.ndarray) -> np.ndarray:
         """
@@ -103,7 +231,6 @@ class ImageEmbedder:
         Returns: 768-dimensional embedding vector (CLIP-Large).
         """
         import cv2
-        self._load_model()
 
         try:
             # Convert BGR (cv2) to RGB (PIL)
@@ -114,21 +241,12 @@ class ImageEmbedder:
             
             # Convert to PIL Image
             pil_image = Image.fromarray(rgb_crop)
-            
-            inputs = self.processor(images=pil_image, return_tensors="pt").to(self.device)
-
-            with torch.no_grad():
-                image_features = self.model.get_image_features(**inputs)
-                embedding = image_features[0].cpu().numpy()
-
-            # Normalize
-            embedding = embedding / np.linalg.norm(embedding)
-            return embedding.astype(np.float32)
         except Exception as e:
             import logging
             logging.error(f"Crop embedding failed: {e}")
             # Return zero vector as fallback
             return np.zeros(self.embedding_dim, dtype=np.float32)
+        return self.embed_pil_batch([pil_image])[0]
 
     def embed_texts_batch(self, texts: list) -> np.ndarray:
         """
@@ -136,20 +254,61 @@ class ImageEmbedder:
         Used for CLIP zero-shot classification.
         Returns: (N, 768) array of normalized embeddings.
         """
+        embeddings = [None] * len(texts)
+        with self._text_embeddings_lock:
+            for i, text in enumerate(texts):
+                if text in self._text_embeddings:
+                    self._text_embeddings.move_to_end(text)
+                    embeddings[i] = self._text_embeddings[text]
+
+        # Repeated texts within one call are encoded once
+        misses = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if misses:
+            computed = dict(zip(misses, self._encode_texts(misses)))
+            with self._text_embeddings_lock:
+                for text, embedding in computed.items():
+                    # _encode_texts returns zeros on failure; never cache those
+                    if np.any(embedding):
+                        self._text_embeddings[text] = embedding
+                while len(self._text_embeddings) > self.TEXT_EMBEDDING_CACHE_SIZE:
+                    self._text_embeddings.popitem(last=False)
+            embeddings = [
+                computed[text] if embedding is None else embedding
+                for text, embedding in zip(texts, embeddings)
+            ]
+
+        if not embeddings:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        return np.stack(embeddings)
+
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Run the CLIP text tower on texts in one batch. Returns (N, 768) normalized embeddings."""
         self._load_model()
 
         try:
             inputs = self.processor(text=texts, return_tensors="pt", padding=True).to(self.device)
 
-            with torch.no_grad():
-                text_features = self.model.get_text_features(**inputs)
-                embeddings = text_features.cpu().numpy()
-
-            # Normalize each embedding
-            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-            embeddings = embeddings / norms
-            return embeddings.astype(np.float32)
+            with torch.inference_mode():
+                # Normalize on-device in FP32, then one transfer for the whole batch
+                text_features = F.normalize(self.model.get_text_features(**inputs).float(), dim=-1)
+                return text_features.cpu().numpy()
         except Exception as e:
             import logging
-            logging.error(f"Batch text embedding failed: {e}")
+            logging.error(f"Text embedding failed for {texts[:3]}: {e}")
             return np.zeros((len(texts), self.embedding_dim), dtype=np.float32)
+
+
+# Shared embedder so every pipeline instance and CLIP scene detector reuses one CLIP model
+_default_embedder = None
+_default_embedder_lock = threading.Lock()
+
+
+def get_image_embedder() -> ImageEmbedder:
+    """Get the process-wide ImageEmbedder singleton. Thread-safe initialization."""
+    global _default_embedder
+    if _default_embedder is None:
+        with _default_embedder_lock:
+            # Double-check locking pattern
+            if _default_embedder is None:
+                _default_embedder = ImageEmbedder()
+    return _default_embedder
@@ -9,13 +9,13 @@ import cv2
 import numpy as np
 from sklearn.cluster import DBSCAN
 
-from services.ml.detectors.face_detector import FaceDetector
-from services.ml.detectors.object_detector import ObjectDetector
-from services.ml.detectors.scene_detector import SceneDetector  # Places365 - now installed!
+from services.ml.detectors.face_detector import FaceDetector, get_face_detector
+from services.ml.detectors.object_detector import ObjectDetector, get_object_detector
+from services.ml.detectors.scene_detector import SceneDetector, get_scene_detector  # Places365 - now installed!
 from services.ml.detectors.clip_scene_detector import CLIPSceneDetector  # CLIP zero-shot scenes
-from services.ml.detectors.florence_detector import FlorenceDetector  # Florence-2 vision-language
-from services.ml.embeddings.face_embedding import FaceEmbedder
-from services.ml.embeddings.image_embedding import ImageEmbedder
+from services.ml.detectors.florence_detector import FlorenceDetector, get_florence_detector  # Florence-2 vision-language
+from services.ml.embeddings.face_embedding import FaceEmbedder, get_face_embedder
+from services.ml.embeddings.image_embedding import ImageEmbedder, get_image_embedder
 from services.ml.storage.faiss_index import FAISSIndex
 from services.ml.storage.sqlite_store import SQLiteStore
 from services.ml.utils.path_utils import validate_photo_path
@@ -44,9 +44,9 @@ class MLPipeline:
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
         # Essential models - load immediately (lightweight)
-        self._face_detector = FaceDetector()
-        self._object_detector = ObjectDetector()
-        self._face_embedder = FaceEmbedder()
+        self._face_detector = get_face_detector()
+        self._object_detector = get_object_detector()
+        self._face_embedder = get_face_embedder()
         
         # Deferred models - load on first use (heavyweight)
         self._scene_detector: Optional[SceneDetector] = None
@@ -76,25 +76,26 @@ class MLPipeline:
     @property
     def scene_detector(self) -> SceneDetector:
         if self._scene_detector is None:
-            self._scene_detector = SceneDetector()
+            self._scene_detector = get_scene_detector()
         return self._scene_detector
     
     @property
     def clip_scene_detector(self) -> CLIPSceneDetector:
         if self._clip_scene_detector is None:
-            self._clip_scene_detector = CLIPSceneDetector()
+            # Share the CLIP model with image embedding instead of loading it twice
+            self._clip_scene_detector = CLIPSceneDetector(embedder=self.image_embedder)
         return self._clip_scene_detector
     
     @property
     def florence_detector(self) -> FlorenceDetector:
         if self._florence_detector is None:
-            self._florence_detector = FlorenceDetector()
+            self._florence_detector = get_florence_detector()
         return self._florence_detector
     
     @property
     def image_embedder(self) -> ImageEmbedder:
         if self._image_embedder is None:
-            self._image_embedder = ImageEmbedder()
+            self._image_embedder = get_image_embedder()
         return self._image_embedder
 
     def _init_indices(self) -> None:
@@ -274,7 +275,7 @@ class MLPipeline:
                 scale_factor=face_scale,
             )
 
-            faces_for_faiss = []
+            faces_to_store = []
             auto_assigned_count = 0
             for face_data in face_detections:
                 x, y, w, h = face_data["bbox"]
@@ -290,22 +291,15 @@ class MLPipeline:
                     except Exception as e:
                         logging.warning(f"Identity matching failed: {str(e)}")
 
-                face_id = self.store.add_face_with_embedding(
-                    photo_id=photo_id,
-                    bbox_x=x,
-                    bbox_y=y,
-                    bbox_w=w,
-                    bbox_h=h,
-                    confidence=conf,
-                    embedding=embedding,
-                    person_id=auto_person_id,
-                )
-
-                faces_for_faiss.append((face_id, embedding))
-                results["faces"].append(face_id)
+                faces_to_store.append(((x, y, w, h), conf, embedding, auto_person_id))
 
-            for face_id, embedding in faces_for_faiss:
-                self.index.add_vectors("face", embedding.reshape(1, -1), [face_id])
+            if faces_to_store:
+                # One transaction for every face, then one FAISS add for the (N, 512) batch
+                face_ids = self.store.add_faces_with_embeddings(photo_id, faces_to_store)
+                self.index.add_vectors(
+                    "face", np.stack([embedding for _, _, embedding, _ in faces_to_store]), face_ids
+                )
+                results["faces"].extend(face_ids)
 
             # OBJECT DETECTION
             try:
@@ -374,12 +368,14 @@ class MLPipeline:
                         pets_for_faiss.append((pet_detection_id, pet_embedding))
                         results["pets"].append(pet_detection_id)
 
-                    for pet_detection_id, pet_embedding in pets_for_faiss:
-                        self.index.add_vectors("pet", pet_embedding.reshape(1, -1), [pet_detection_id])
+                    if pets_for_faiss:
+                        pet_ids, pet_embeddings = zip(*pets_for_faiss)
+                        self.index.add_vectors("pet", np.stack(pet_embeddings), list(pet_ids))
             except Exception as e:
                 logging.warning(f"Pet detection failed for {photo_path}: {e}")
 
             # IMAGE EMBEDDING
+            image_embedding = None
             try:
                 image_embedding = self.image_embedder.embed_pil(ml_image_rgb)
                 self.index.add_vectors("image", image_embedding.reshape(1, -1), [photo_id])
@@ -394,6 +390,7 @@ class MLPipeline:
                     results.get("objects", []),
                     ml_image_rgb=ml_image_rgb,
                     florence_image_rgb=florence_image,
+                    image_embedding=image_embedding,
                 )
 
                 stored_tags = set()
@@ -591,7 +588,7 @@ class MLPipeline:
                 scale_factor=face_scale,
             )
 
-            faces_for_faiss = []
+            faces_to_store = []
             auto_assigned_count = 0
             for face_data in face_detections:
                 x, y, w, h = face_data["bbox"]
@@ -608,22 +605,15 @@ class MLPipeline:
                     except Exception as e:
                         logging.warning(f"Identity matching failed: {str(e)}")
 
-                face_id = self.store.add_face_with_embedding(
-                    photo_id=photo_id,
-                    bbox_x=x,
-                    bbox_y=y,
-                    bbox_w=w,
-                    bbox_h=h,
-                    confidence=conf,
-                    embedding=embedding,
-                    person_id=auto_person_id,
-                )
-
-                faces_for_faiss.append((face_id, embedding))
-                results["faces"].append(face_id)
+                faces_to_store.append(((x, y, w, h), conf, embedding, auto_person_id))
 
-            for face_id, embedding in faces_for_faiss:
-                self.index.add_vectors("face", embedding.reshape(1, -1), [face_id])
+            if faces_to_store:
+                # One transaction for every face, then one FAISS add for the (N, 512) batch
+                face_ids = self.store.add_faces_with_embeddings(photo_id, faces_to_store)
+                self.index.add_vectors(
+                    "face", np.stack([embedding for _, _, embedding, _ in faces_to_store]), face_ids
+                )
+                results["faces"].extend(face_ids)
 
             if auto_assigned_count > 0:
                 logging.info(f"Auto-assigned {auto_assigned_count} faces to known people")
@@ -699,14 +689,16 @@ class MLPipeline:
                         pets_for_faiss.append((pet_detection_id, pet_embedding))
                         results["pets"].append(pet_detection_id)
 
-                    for pet_detection_id, pet_embedding in pets_for_faiss:
-                        self.index.add_vectors("pet", pet_embedding.reshape(1, -1), [pet_detection_id])
+                    if pets_for_faiss:
+                        pet_ids, pet_embeddings = zip(*pets_for_faiss)
+                        self.index.add_vectors("pet", np.stack(pet_embeddings), list(pet_ids))
             except Exception as e:
                 logging.warning(f"Pet detection failed for {photo_path}: {e}")
 
             # =======================================================================
             # IMAGE EMBEDDING (optional)
             # =======================================================================
+            image_embedding = None
             try:
                 image_embedding = self.image_embedder.embed_pil(ml_image_rgb)
                 self.index.add_vectors("image", image_embedding.reshape(1, -1), [photo_id])
@@ -723,6 +715,7 @@ class MLPipeline:
                     results.get("objects", []),
                     ml_image_rgb=ml_image_rgb,
                     florence_image_rgb=florence_image,
+                    image_embedding=image_embedding,
                 )
 
                 stored_tags = set()
@@ -773,7 +766,8 @@ class MLPipeline:
         image_path: str, 
         object_ids: List[int],
         ml_image_rgb: Optional['Image.Image'] = None,
-        florence_image_rgb: Optional['Image.Image'] = None
+        florence_image_rgb: Optional['Image.Image'] = None,
+        image_embedding: Optional[np.ndarray] = None,
     ) -> List[Tuple[str, float, str]]:
         """
         Fused scene detection combining Places365, CLIP, Florence-2, and YOLO evidence.
@@ -783,6 +777,7 @@ class MLPipeline:
             object_ids: List of object IDs detected in this image
             ml_image_rgb: Optional pre-decoded PIL RGB image for Places365/CLIP
             florence_image_rgb: Optional pre-decoded PIL RGB image for Florence-2
+            image_embedding: Optional CLIP embedding of ml_image_rgb, reused by CLIP scenes
             
         Returns:
             List of (tag, confidence, source) tuples, sorted by confidence
@@ -797,15 +792,18 @@ class MLPipeline:
         # 1. Places365 Scene Detection (with pre-decoded image)
         # =====================================================================
         try:
+            # Simplified category tags and detailed detections share one forward pass
+            detailed, places_tags = self.scene_detector.detect_with_tags(
+                image_path, top_k=10, image_rgb=ml_image_rgb
+            )
+            
             # Get simplified category tags
-            places_tags = self.scene_detector.get_all_scene_tags(image_path, image_rgb=ml_image_rgb)
             for tag in places_tags:
                 if tag not in seen_tags:
                     all_tags.append((tag, 0.8, 'places365'))  # High confidence for categorical match
                     seen_tags.add(tag)
             
             # Get detailed detections with confidence
-            detailed = self.scene_detector.detect(image_path, top_k=10, image_rgb=ml_image_rgb)
             for scene_label, confidence in detailed:
                 if confidence >= SCENE_FUSION_CONFIG["places365_min_confidence"]:
                     # Extract base tag from detailed label (e.g., "sky/sunset" -> "sunset")
@@ -822,7 +820,11 @@ class MLPipeline:
         # 2. CLIP Zero-Shot Scene Detection (with pre-decoded image)
         # =====================================================================
         try:
-            clip_detections = self.clip_scene_detector.detect(image_path, image_rgb=ml_image_rgb)
+            clip_detections = self.clip_scene_detector.detect(
+                image_path,
+                image_rgb=ml_image_rgb,
+                image_embedding=image_embedding,
+            )
             for tag, confidence in clip_detections:
                 if confidence >= SCENE_FUSION_CONFIG["clip_min_confidence"]:
                     if tag not in seen_tags:
@@ -10,11 +10,13 @@ Features:
 - Backup creation before rebuild
 """
 
+import atexit
 import hashlib
 import logging
 import pickle
 import shutil
 import threading
+import weakref
 from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
@@ -93,6 +95,7 @@ class FAISSIndex:
         self._search_cache: dict[str, LRUCache] = {}
         # Track dirty indices that need saving
         self._dirty: set[str] = set()
+        _live_indices.add(self)
         # Rebuild callbacks for auto-recovery
         self._rebuild_callbacks: dict[str, Callable] = {}
 
@@ -410,7 +413,8 @@ class FAISSIndex:
             id_map = self._id_maps[embedding_type]
 
             # Normalize for cosine similarity if needed
-            vectors_copy = vectors.astype(np.float32).copy()
+            # One float32 copy (normalize_L2 works in place, so never alias the caller's array)
+            vectors_copy = np.array(vectors, dtype=np.float32)
             if isinstance(index, faiss.IndexFlatIP):
                 faiss.normalize_L2(vectors_copy)
 
@@ -596,3 +600,17 @@ class FAISSIndex:
                 "integrity": integrity,
             }
         return stats
+
+
+# Live indices, saved once at interpreter exit so vectors added since the last
+# periodic save_all_dirty() are not lost
+_live_indices: "weakref.WeakSet[FAISSIndex]" = weakref.WeakSet()
+
+
+@atexit.register
+def _save_live_indices() -> None:
+    for index in list(_live_indices):
+        try:
+            index.save_all_dirty()
+        except Exception as e:
+            logger.error(f"Failed to save FAISS indices at exit: {e}")
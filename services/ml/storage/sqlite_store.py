@@ -317,6 +317,15 @@ class SQLiteStore:
         except sqlite3.OperationalError:
             pass
         
+        # People cluster index (duplicate detection and cluster lookups)
+        try:
+            cursor.execute("PRAGMA table_info(people)")
+            columns = [row[1] for row in cursor.fetchall()]
+            if "cluster_id" in columns:
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_people_cluster ON people(cluster_id)")
+        except sqlite3.OperationalError:
+            pass
+
         try:
             cursor.execute("PRAGMA table_info(objects)")
             columns = [row[1] for row in cursor.fetchall()]
@@ -659,29 +668,63 @@ class SQLiteStore:
     ) -> int:
         """Add face and embedding atomically in single transaction. Returns face_id."""
         with self._transaction() as conn:
-            cursor = conn.cursor()
-            # 1. Insert face
-            cursor.execute(
-                """
-                INSERT INTO faces (photo_id, bbox_x, bbox_y, bbox_w, bbox_h, confidence, cluster_id, person_id, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """,
-                (photo_id, bbox_x, bbox_y, bbox_w, bbox_h, confidence, cluster_id, person_id),
+            return self._insert_face_with_embedding(
+                conn.cursor(), photo_id, (bbox_x, bbox_y, bbox_w, bbox_h), confidence, embedding, cluster_id, person_id
             )
-            face_id = cursor.lastrowid
-            
-            # 2. Store embedding
-            embedding_bytes = embedding.tobytes()
-            cursor.execute(
-                "INSERT INTO embeddings (face_id, embedding) VALUES (?, ?)",
-                (face_id, embedding_bytes),
-            )
-            embedding_id = cursor.lastrowid
-            
-            # 3. Update face with embedding_id reference
-            cursor.execute("UPDATE faces SET embedding_id = ? WHERE id = ?", (embedding_id, face_id))
-            
-            return face_id
+
+    def add_faces_with_embeddings(
+        self,
+        photo_id: int,
+        faces: List[Tuple[Tuple[int, int, int, int], float, np.ndarray, Optional[int]]],
+    ) -> List[int]:
+        """
+        Add all faces of a photo with their embeddings in a single transaction.
+        Each face is (bbox (x, y, w, h), confidence, embedding, person_id).
+        Returns face_ids in input order.
+        """
+        if not faces:
+            return []
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+            return [
+                self._insert_face_with_embedding(cursor, photo_id, bbox, confidence, embedding, None, person_id)
+                for bbox, confidence, embedding, person_id in faces
+            ]
+
+    @staticmethod
+    def _insert_face_with_embedding(
+        cursor: sqlite3.Cursor,
+        photo_id: int,
+        bbox: Tuple[int, int, int, int],
+        confidence: float,
+        embedding: np.ndarray,
+        cluster_id: Optional[int],
+        person_id: Optional[int],
+    ) -> int:
+        """Insert a face, its embedding, and the link between them. Returns face_id."""
+        bbox_x, bbox_y, bbox_w, bbox_h = bbox
+        # 1. Insert face
+        cursor.execute(
+            """
+            INSERT INTO faces (photo_id, bbox_x, bbox_y, bbox_w, bbox_h, confidence, cluster_id, person_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            (photo_id, bbox_x, bbox_y, bbox_w, bbox_h, confidence, cluster_id, person_id),
+        )
+        face_id = cursor.lastrowid
+        
+        # 2. Store embedding
+        embedding_bytes = embedding.tobytes()
+        cursor.execute(
+            "INSERT INTO embeddings (face_id, embedding) VALUES (?, ?)",
+            (face_id, embedding_bytes),
+        )
+        embedding_id = cursor.lastrowid
+        
+        # 3. Update face with embedding_id reference
+        cursor.execute("UPDATE faces SET embedding_id = ? WHERE id = ?", (embedding_id, face_id))
+        
+        return face_id
 
     def add_face(
         self,
@@ -754,6 +797,15 @@ class SQLiteStore:
         conn.close()
         return [dict(row) for row in rows]
 
+    def count_faces_for_person(self, person_id: int) -> int:
+        """Count faces assigned to a person."""
+        conn = self._connect(readonly=True)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM faces WHERE person_id = ?", (person_id,))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
     def add_object(
         self,
         photo_id: int,
@@ -1026,6 +1078,43 @@ class SQLiteStore:
         conn.close()
         return [dict(row) for row in rows]
 
+    def get_people_in_duplicate_clusters(self) -> List[Dict]:
+        """Get people whose cluster_id is shared with at least one other person."""
+        conn = self._connect(readonly=True)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT * FROM people
+            WHERE cluster_id IN (
+                SELECT cluster_id FROM people
+                WHERE cluster_id IS NOT NULL
+                GROUP BY cluster_id
+                HAVING COUNT(*) > 1
+            )
+            ORDER BY name, id
+            """
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def get_people_with_no_faces(self) -> List[Dict]:
+        """Get people that have no faces assigned to them."""
+        conn = self._connect(readonly=True)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT p.* FROM people p
+            WHERE NOT EXISTS (SELECT 1 FROM faces f WHERE f.person_id = p.id)
+            ORDER BY p.name, p.id
+            """
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
     def update_person_name(self, person_id: int, name: str) -> None:
         """Update person name."""
         conn = self._connect(readonly=False)
@@ -2134,6 +2223,19 @@ class SQLiteStore:
             conn.close()
             raise e
 
+    def add_tags(self, photo_id: int, tags: List[str]) -> None:
+        """
+        Add several already-normalized custom tags to a photo in one transaction.
+        Tags already on the photo are ignored.
+        """
+        if not tags:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO photo_tags (photo_id, tag) VALUES (?, ?)",
+                [(photo_id, tag) for tag in tags],
+            )
+
     def remove_tag(self, photo_id: int, tag: str) -> bool:
         """Remove a custom tag from a photo. Returns True if deleted."""
         normalized_tag = tag.lower().strip()
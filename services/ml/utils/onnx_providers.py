@@ -0,0 +1,43 @@
+# PhotoSense-AI - https://github.com/abhishekanand16/PhotoSense-AI
+# Copyright (c) 2026 Abhishek Anand. Licensed under AGPL-3.0.
+"""ONNX Runtime provider and session settings for the InsightFace models."""
+
+import os
+from typing import List, Tuple
+
+
+def execution_providers() -> Tuple[List, int]:
+    """
+    Pick the fastest available ONNX Runtime providers, with CPU last as fallback.
+
+    Returns (providers, ctx_id). InsightFace's prepare() pins every session back
+    to CPU when ctx_id < 0, so GPU providers need ctx_id=0.
+    """
+    import onnxruntime as ort
+    available = set(ort.get_available_providers())
+    if "CUDAExecutionProvider" in available:
+        # The number of face crops changes per photo; pick conv algorithms
+        # heuristically instead of benchmarking every new batch shape
+        cuda_options = {"cudnn_conv_algo_search": "HEURISTIC"}
+        return [("CUDAExecutionProvider", cuda_options), "CPUExecutionProvider"], 0
+    if "DmlExecutionProvider" in available:
+        # DirectML (Windows GPUs without CUDA)
+        return ["DmlExecutionProvider", "CPUExecutionProvider"], 0
+    return ["CPUExecutionProvider"], -1
+
+
+def session_options(providers: List):
+    """
+    ONNX Runtime options for the face models.
+    The two scan workers run face detection concurrently, so each session gets
+    half the cores instead of both oversubscribing every core.
+    """
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+    if "DmlExecutionProvider" in providers:
+        # DirectML does not support memory pattern planning
+        options.enable_mem_pattern = False
+    return options